@@ -3,8 +3,8 @@ from typing import Dict, Any
 from models.ai_models import model_manager
 from utils.logger import logger
 from utils.image_processing import ImageProcessor
+from utils.uploads import enforce_upload_limit
 from api.auth import get_current_user
-from config import settings
 import aiofiles
 import os
 from datetime import datetime
@@ -22,10 +22,9 @@ async def analyze_crop_health(
         if not image.content_type.startswith('image/'):
             raise HTTPException(status_code=400, detail="File must be an image")
         
-        # Check file size
+        # Check file size before pulling the upload into memory
+        await enforce_upload_limit(image)
         contents = await image.read()
-        if len(contents) > settings.MAX_FILE_SIZE:
-            raise HTTPException(status_code=400, detail="File too large")
         
         # Validate image
         if not ImageProcessor.validate_image(contents):
@@ -38,7 +37,7 @@ async def analyze_crop_health(
         result = await model_manager.analyze_crop_health(enhanced_image)
         
         # Log analysis
-        logger.info(f"Crop analysis completed for user {current_user['uid']}")
+        logger.info("Crop analysis completed for user %s", current_user['uid'])
         
         return {
             "success": True,
@@ -64,10 +63,9 @@ async def detect_pests(
         if not image.content_type.startswith('image/'):
             raise HTTPException(status_code=400, detail="File must be an image")
         
-        # Check file size
+        # Check file size before pulling the upload into memory
+        await enforce_upload_limit(image)
         contents = await image.read()
-        if len(contents) > settings.MAX_FILE_SIZE:
-            raise HTTPException(status_code=400, detail="File too large")
         
         # Validate image
         if not ImageProcessor.validate_image(contents):
@@ -80,7 +78,7 @@ async def detect_pests(
         result = await model_manager.detect_pests(enhanced_image)
         
         # Log analysis
-        logger.info(f"Pest detection completed for user {current_user['uid']}")
+        logger.info("Pest detection completed for user %s", current_user['uid'])
         
         return {
             "success": True,
@@ -106,10 +104,9 @@ async def analyze_soil(
         if not image.content_type.startswith('image/'):
             raise HTTPException(status_code=400, detail="File must be an image")
         
-        # Check file size
+        # Check file size before pulling the upload into memory
+        await enforce_upload_limit(image)
         contents = await image.read()
-        if len(contents) > settings.MAX_FILE_SIZE:
-            raise HTTPException(status_code=400, detail="File too large")
         
         # Validate image
         if not ImageProcessor.validate_image(contents):
@@ -122,7 +119,7 @@ async def analyze_soil(
         result = await model_manager.analyze_soil(enhanced_image)
         
         # Log analysis
-        logger.info(f"Soil analysis completed for user {current_user['uid']}")
+        logger.info("Soil analysis completed for user %s", current_user['uid'])
         
         return {
             "success": True,
@@ -181,15 +178,15 @@ async def batch_analyze_images(
             for i, image in enumerate(crop_images):
                 try:
                     if image.content_type.startswith('image/'):
+                        await enforce_upload_limit(image)
                         contents = await image.read()
-                        if len(contents) <= settings.MAX_FILE_SIZE:
-                            enhanced_image = ImageProcessor.enhance_image_quality(contents)
-                            result = await model_manager.analyze_crop_health(enhanced_image)
-                            results["crop_analyses"].append({
-                                "image_index": i,
-                                "filename": image.filename,
-                                "result": result
-                            })
+                        enhanced_image = ImageProcessor.enhance_image_quality(contents)
+                        result = await model_manager.analyze_crop_health(enhanced_image)
+                        results["crop_analyses"].append({
+                            "image_index": i,
+                            "filename": image.filename,
+                            "result": result
+                        })
                 except Exception as e:
                     results["errors"].append(f"Crop image {i}: {str(e)}")
         
@@ -198,15 +195,15 @@ async def batch_analyze_images(
             for i, image in enumerate(pest_images):
                 try:
                     if image.content_type.startswith('image/'):
+                        await enforce_upload_limit(image)
                         contents = await image.read()
-                        if len(contents) <= settings.MAX_FILE_SIZE:
-                            enhanced_image = ImageProcessor.enhance_image_quality(contents)
-                            result = await model_manager.detect_pests(enhanced_image)
-                            results["pest_detections"].append({
-                                "image_index": i,
-                                "filename": image.filename,
-                                "result": result
-                            })
+                        enhanced_image = ImageProcessor.enhance_image_quality(contents)
+                        result = await model_manager.detect_pests(enhanced_image)
+                        results["pest_detections"].append({
+                            "image_index": i,
+                            "filename": image.filename,
+                            "result": result
+                        })
                 except Exception as e:
                     results["errors"].append(f"Pest image {i}: {str(e)}")
         
@@ -215,19 +212,19 @@ async def batch_analyze_images(
             for i, image in enumerate(soil_images):
                 try:
                     if image.content_type.startswith('image/'):
+                        await enforce_upload_limit(image)
                         contents = await image.read()
-                        if len(contents) <= settings.MAX_FILE_SIZE:
-                            enhanced_image = ImageProcessor.enhance_image_quality(contents)
-                            result = await model_manager.analyze_soil(enhanced_image)
-                            results["soil_analyses"].append({
-                                "image_index": i,
-                                "filename": image.filename,
-                                "result": result
-                            })
+                        enhanced_image = ImageProcessor.enhance_image_quality(contents)
+                        result = await model_manager.analyze_soil(enhanced_image)
+                        results["soil_analyses"].append({
+                            "image_index": i,
+                            "filename": image.filename,
+                            "result": result
+                        })
                 except Exception as e:
                     results["errors"].append(f"Soil image {i}: {str(e)}")
         
-        logger.info(f"Batch analysis completed for user {current_user['uid']}")
+        logger.info("Batch analysis completed for user %s", current_user['uid'])
         
         return {
             "success": True,
@@ -1,4 +1,5 @@
 from fastapi import APIRouter, HTTPException, Depends, status
+from fastapi.responses import ORJSONResponse
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from pydantic import BaseModel, Field
 from typing import Optional, Dict, Any
@@ -6,8 +7,13 @@ from auth.firebase_auth import firebase_auth
 from utils.logger import logger
 import re
 
-router = APIRouter(prefix="/auth", tags=["authentication"])
+router = APIRouter(prefix="/auth", tags=["authentication"], default_response_class=ORJSONResponse)
 security = HTTPBearer()
+optional_security = HTTPBearer(auto_error=False)
+
+# Input formats, compiled once at import
+_PHONE_RE = re.compile(r'^\+91[6-9]\d{9}$')
+_AADHAAR_RE = re.compile(r'^\d{12}$')
 
 class PhoneOTPRequest(BaseModel):
     phone_number: str = Field(..., description="Phone number with country code")
@@ -38,42 +44,49 @@ class UserUpdateRequest(BaseModel):
 def validate_phone_number(phone: str) -> bool:
     """Validate phone number format"""
     # Basic validation for Indian phone numbers
-    pattern = r'^\+91[6-9]\d{9}$'
-    return bool(re.match(pattern, phone))
+    return _PHONE_RE.match(phone) is not None
 
 def validate_aadhaar_number(aadhaar: str) -> bool:
     """Validate Aadhaar number format"""
     # Basic Aadhaar validation (12 digits)
-    pattern = r'^\d{12}$'
-    return bool(re.match(pattern, aadhaar.replace(' ', '')))
+    return _AADHAAR_RE.match(aadhaar.replace(' ', '')) is not None
 
-async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
-    """Get current authenticated user"""
+async def _resolve_user(token: str) -> Optional[Dict[str, Any]]:
+    """Resolve a bearer token to its user, or None if it cannot be authenticated"""
     try:
-        token = credentials.credentials
         decoded_token = await firebase_auth.verify_token(token)
-        
         if not decoded_token:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Invalid authentication token"
-            )
+            logger.error("Authentication error: invalid authentication token")
+            return None
         
         user_data = await firebase_auth.get_user(decoded_token['uid'])
         if not user_data:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="User not found"
-            )
+            logger.error("Authentication error: user not found")
+            return None
         
         return user_data
         
     except Exception as e:
         logger.error(f"Authentication error: {e}")
+        return None
+
+async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
+    """Get current authenticated user"""
+    user_data = await _resolve_user(credentials.credentials)
+    if user_data is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Authentication failed"
         )
+    return user_data
+
+async def get_current_user_optional(
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(optional_security)
+) -> Optional[Dict[str, Any]]:
+    """Get current user if a valid token was sent, otherwise None"""
+    if credentials is None:
+        return None
+    return await _resolve_user(credentials.credentials)
 
 @router.post("/send-otp")
 async def send_otp(request: PhoneOTPRequest):
@@ -248,10 +261,7 @@ async def update_user_profile(
             )
         
         # Prepare update data (only include non-None values)
-        update_data = {}
-        for field, value in request.dict().items():
-            if value is not None:
-                update_data[field] = value
+        update_data = request.model_dump(exclude_none=True)
         
         success = await firebase_auth.update_user(current_user["uid"], update_data)
         
@@ -279,8 +289,12 @@ async def update_user_profile(
         )
 
 @router.post("/logout")
-async def logout_user(current_user: Dict = Depends(get_current_user)):
-    """Logout user (invalidate token on client side)"""
+async def logout_user(
+    current_user: Dict = Depends(get_current_user),
+    credentials: HTTPAuthorizationCredentials = Depends(security)
+):
+    """Logout user and revoke the token used for this request"""
+    await firebase_auth.revoke_token(credentials.credentials)
     return {
         "success": True,
         "message": "Logged out successfully"
@@ -1,6 +1,6 @@
 from fastapi import APIRouter
 
-from api.v1.endpoints import crop_detection, soil_detection, pest_detection
+from api.v1.endpoints import crop_detection, soil_detection, pest_detection, configuration
 
 api_router = APIRouter()
 
@@ -23,6 +23,12 @@ api_router.include_router(
     tags=["pest-detection"]
 )
 
+api_router.include_router(
+    configuration.router, 
+    prefix="/configuration", 
+    tags=["configuration"]
+)
+
 @api_router.get("/")
 async def root():
     """Root endpoint for API v1"""
@@ -1,15 +1,49 @@
-from fastapi import APIRouter, HTTPException
-from fastapi.responses import JSONResponse
+from fastapi import APIRouter, HTTPException, Request, Depends
+from fastapi.responses import ORJSONResponse, Response
 from pydantic import BaseModel
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, Callable, Awaitable, Tuple
 import logging
 import asyncio
+import hashlib
+import re
+import time
 import httpx
-from datetime import datetime
+import orjson
+from datetime import datetime, timezone
+
+from config.settings import settings
+from utils.single_flight import single_flight
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
+# Validation cache policies (seconds): results are served from the cache while
+# fresh and retained afterwards as a fallback for unreachable upstreams
+CACHE_POLICIES: Dict[str, Dict[str, int]] = {
+    "firebase": {"fresh": 60, "retain": 3600},  # long
+    "weather": {"fresh": 30, "retain": 3600},   # normal
+    "kyc": {"fresh": 10, "retain": 3600},       # short
+}
+
+# Validations currently running, keyed like the cache, so identical
+# concurrent requests share a single upstream probe
+_inflight: Dict[str, asyncio.Task] = {}
+
+# Upstream timeouts: the user waits on these requests, so fail fast
+VALIDATION_TIMEOUT = httpx.Timeout(
+    connect=settings.VALIDATION_TIMEOUT_CONNECT,
+    read=settings.VALIDATION_TIMEOUT_READ,
+    write=5.0,
+    pool=1.0
+)
+# Tighter per-probe timeout for KYC, which probes several URLs
+KYC_PROBE_TIMEOUT = httpx.Timeout(connect=1.0, read=3.0, write=3.0, pool=1.0)
+
+# Firebase format checks, compiled once at import
+_PROJECT_ID_RE = re.compile(r'^[A-Za-z0-9_-]{1,63}$')
+# Google API keys are 39 characters: 'AIza' followed by 35 URL-safe characters
+_API_KEY_RE = re.compile(r'^AIza[0-9A-Za-z_-]{35}$')
+
 # Pydantic models for request/response
 class FirebaseConfig(BaseModel):
     projectId: str
@@ -34,279 +68,475 @@ class FullConfiguration(BaseModel):
     weather: WeatherConfig
     kyc: KYCConfig
 
-@router.post("/validate-firebase")
-async def validate_firebase_config(config: FirebaseConfig) -> JSONResponse:
+_iso_cache: Dict[str, Any] = {"t": 0, "s": ""}
+
+def now_iso() -> str:
+    """Current UTC time as an ISO 8601 string, formatted at most once per second"""
+    t = int(time.time())
+    cache = _iso_cache
+    if cache["t"] != t:
+        cache["s"] = datetime.fromtimestamp(t, timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+        cache["t"] = t
+    return cache["s"]
+
+async def get_http_client(request: Request) -> httpx.AsyncClient:
+    """Shared HTTP client created in the application lifespan"""
+    return request.app.state.http
+
+async def get_redis(request: Request) -> Optional[Any]:
+    """Redis client for validation results (None when caching is disabled)"""
+    return getattr(request.app.state, "redis", None)
+
+def _cache_key(service: str, config: BaseModel) -> str:
+    """Build the cache key for a configuration payload"""
+    payload = orjson.dumps(config.model_dump(), option=orjson.OPT_SORT_KEYS)
+    return f"cfgval:{service}:{hashlib.sha256(payload).hexdigest()}"
+
+async def _cached(
+    redis: Optional[Any],
+    service: str,
+    config: BaseModel,
+    probe: Callable[[], Awaitable[Dict[str, Any]]]
+) -> Dict[str, Any]:
     """
-    Validate Firebase configuration
+    Return a cached validation result, running the upstream probe on a miss
     
-    Args:
-        config: Firebase configuration to validate
-        
-    Returns:
-        JSON response with validation result
+    Identical validations in flight at the same time share one lookup and
+    probe. When the upstream cannot be reached the last stored result is
+    served instead and marked as stale.
     """
+    key = _cache_key(service, config)
+    return await single_flight(_inflight, key, lambda: _lookup_or_probe(redis, service, key, probe))
+
+async def _lookup_or_probe(
+    redis: Optional[Any],
+    service: str,
+    key: str,
+    probe: Callable[[], Awaitable[Dict[str, Any]]]
+) -> Dict[str, Any]:
+    """Serve a fresh Redis entry or probe the upstream and store the result"""
+    if redis is None:
+        return await probe()
+    
+    policy = CACHE_POLICIES[service]
+    entry = {}
+    
+    try:
+        entry = await redis.hgetall(key)
+        if entry and time.time() < float(entry["stale_at"]):
+            return orjson.loads(entry["body"])
+    except Exception as e:
+        logger.warning("Validation cache read failed: %s", e)
+    
     try:
-        logger.info(f"Validating Firebase config for project: {config.projectId}")
+        result = await probe()
+    except httpx.ConnectError:
+        if not entry:
+            raise
+        logger.warning("Upstream unreachable, serving stale %s validation result", service)
+        return {**orjson.loads(entry["body"]), "stale": True}
+    
+    try:
+        now = time.time()
+        pipe = redis.pipeline()
+        pipe.hset(key, mapping={
+            "body": orjson.dumps(result),
+            "generated_at": now,
+            "stale_at": now + policy["fresh"]
+        })
+        pipe.expire(key, policy["retain"])
+        await pipe.execute()
+    except Exception as e:
+        logger.warning("Validation cache write failed: %s", e)
+    
+    return result
+
+async def _probe_firebase(config: FirebaseConfig, client: httpx.AsyncClient) -> Dict[str, Any]:
+    """Test Firebase configuration by making a request to Firebase REST API"""
+    # Test with a simple auth request
+    test_url = f"https://identitytoolkit.googleapis.com/v1/accounts:signUp?key={config.apiKey}"
+    response = await client.post(test_url, json={}, timeout=VALIDATION_TIMEOUT)
+    
+    if response.status_code == 400:
+        error = orjson.loads(response.content).get("error", {})
+        error_code = error.get("message", "")
         
-        # Basic validation
-        if not config.projectId or not config.apiKey:
-            return JSONResponse(content={
-                "valid": False,
-                "error": "Project ID and API Key are required"
-            })
+        # A missing email error means the API key was accepted
+        if error_code.startswith("MISSING_EMAIL"):
+            return {
+                "valid": True,
+                "message": "Firebase configuration is valid"
+            }
         
-        # Validate project ID format
-        if not config.projectId.replace('-', '').replace('_', '').isalnum():
-            return JSONResponse(content={
+        # Check for invalid API key error (reported as a detail reason)
+        if "API_KEY_INVALID" in error_code or any(
+            detail.get("reason") == "API_KEY_INVALID" for detail in error.get("details", [])
+        ):
+            return {
                 "valid": False,
-                "error": "Invalid project ID format"
-            })
+                "error": "Invalid Firebase API key"
+            }
+    
+    # If we reach here, assume it's valid (Firebase API might be working)
+    return {
+        "valid": True,
+        "message": "Firebase configuration appears to be valid"
+    }
+
+async def _probe_weather(config: WeatherConfig, client: httpx.AsyncClient) -> Dict[str, Any]:
+    """Test the weather API with a sample request"""
+    test_url = f"{config.endpoint}/weather"
+    params = {
+        "q": config.testLocation,
+        "appid": config.apiKey,
+        "units": "metric"
+    }
+    
+    response = await client.get(test_url, params=params, timeout=VALIDATION_TIMEOUT)
+    
+    if response.status_code == 200:
+        weather_data = orjson.loads(response.content)
+        return {
+            "valid": True,
+            "message": "Weather API is working correctly",
+            "data": weather_data
+        }
+    elif response.status_code == 401:
+        return {
+            "valid": False,
+            "error": "Invalid API key. Please check your OpenWeatherMap API key."
+        }
+    elif response.status_code == 404:
+        return {
+            "valid": False,
+            "error": f"Location '{config.testLocation}' not found. Please check the location format."
+        }
+    else:
+        error_data = orjson.loads(response.content) if response.headers.get('content-type', '').startswith('application/json') else {}
+        return {
+            "valid": False,
+            "error": f"API request failed: {error_data.get('message', f'HTTP {response.status_code}')}"
+        }
+
+async def _probe_kyc(config: KYCConfig, client: httpx.AsyncClient) -> Dict[str, Any]:
+    """Test the KYC API endpoint"""
+    # Try to make a simple request to test connectivity
+    headers = {
+        "Authorization": f"Bearer {config.apiKey}",
+        "Content-Type": "application/json"
+    }
+    
+    if config.authToken:
+        headers["X-Auth-Token"] = config.authToken
+    
+    # Most KYC APIs have a status or health endpoint
+    test_endpoints = [
+        f"{config.endpoint}/status",
+        f"{config.endpoint}/health", 
+        f"{config.endpoint}/",
+        config.endpoint
+    ]
+    
+    last_error = None
+    
+    # Probe all endpoints concurrently; the first one that answers wins
+    tasks = [
+        asyncio.create_task(client.get(test_url, headers=headers, timeout=KYC_PROBE_TIMEOUT))
+        for test_url in test_endpoints
+    ]
+    
+    try:
+        for next_response in asyncio.as_completed(tasks, timeout=10.0):
+            try:
+                response = await next_response
+            except Exception as e:
+                last_error = str(e)
+                continue
+            
+            if response.status_code in [200, 401, 403]:
+                # 200 = success, 401/403 = auth issue but endpoint exists
+                if response.status_code == 200:
+                    return {
+                        "valid": True,
+                        "message": "KYC API endpoint is accessible and responding"
+                    }
+                else:
+                    return {
+                        "valid": True,
+                        "message": "KYC API endpoint exists (authentication may need adjustment)"
+                    }
+    
+    except asyncio.TimeoutError:
+        last_error = last_error or "Timed out waiting for KYC API endpoints"
+    finally:
+        # Drop the probes that are still in flight
+        for task in tasks:
+            task.cancel()
+    
+    # If all endpoints failed, try a POST request (some APIs only respond to POST)
+    try:
+        response = await client.post(
+            f"{config.endpoint}/verify", 
+            headers=headers, 
+            json={"test": True},
+            timeout=KYC_PROBE_TIMEOUT
+        )
+        
+        if response.status_code in [200, 400, 401, 403, 422]:
+            return {
+                "valid": True,
+                "message": "KYC API endpoint is accessible"
+            }
+            
+    except Exception:
+        pass
+    
+    return {
+        "valid": False,
+        "error": f"Unable to connect to KYC API endpoint. Last error: {last_error or 'Connection failed'}"
+    }
+
+def _check_firebase_format(config: FirebaseConfig) -> Optional[Dict[str, Any]]:
+    """Return an error result if the Firebase config is malformed, else None"""
+    # Basic validation
+    if not config.projectId or not config.apiKey:
+        return {
+            "valid": False,
+            "error": "Project ID and API Key are required"
+        }
+    
+    # Validate project ID format
+    if not _PROJECT_ID_RE.fullmatch(config.projectId):
+        return {
+            "valid": False,
+            "error": "Invalid project ID format"
+        }
+    
+    # Validate API key format ('AIza' + 35 characters)
+    if not _API_KEY_RE.fullmatch(config.apiKey):
+        return {
+            "valid": False,
+            "error": "Invalid API key format. Firebase API keys are 39 characters long: "
+                     "'AIza' followed by 35 letters, digits, '-' or '_'"
+        }
+    
+    return None
+
+def _check_weather_format(config: WeatherConfig) -> Optional[Dict[str, Any]]:
+    """Return an error result if the Weather API config is incomplete, else None"""
+    if not config.apiKey:
+        return {
+            "valid": False,
+            "error": "API Key is required"
+        }
+    return None
+
+def _check_kyc_format(config: KYCConfig) -> Optional[Dict[str, Any]]:
+    """Return an error result if the KYC config is incomplete, else None"""
+    if not config.apiKey or not config.endpoint:
+        return {
+            "valid": False,
+            "error": "API Key and Endpoint are required"
+        }
+    return None
+
+async def _validate_firebase_impl(
+    config: FirebaseConfig,
+    client: httpx.AsyncClient,
+    redis: Optional[Any] = None
+) -> Dict[str, Any]:
+    """Validate Firebase configuration format and connectivity"""
+    try:
+        logger.info("Validating Firebase config for project: %s", config.projectId)
+        
+        format_error = _check_firebase_format(config)
+        if format_error:
+            return format_error
         
-        # Validate API key format (should start with AIza)
-        if not config.apiKey.startswith('AIza'):
-            return JSONResponse(content={
+        try:
+            return await _cached(redis, "firebase", config, lambda: _probe_firebase(config, client))
+            
+        except httpx.ConnectTimeout:
+            return {
                 "valid": False,
-                "error": "Invalid API key format. Firebase API keys should start with 'AIza'"
-            })
+                "error": "Timeout connecting to Firebase. Please check your internet connection.",
+                "timeout": "connect"
+            }
+        except httpx.TimeoutException:
+            return {
+                "valid": False,
+                "error": "Timeout waiting for a response from Firebase. Please try again.",
+                "timeout": "read"
+            }
+        except Exception as e:
+            logger.error("Error testing Firebase API: %s", e)
+            # If we can't test, assume it's valid if format is correct
+            return {
+                "valid": True,
+                "message": "Firebase configuration format is valid (unable to test connectivity)"
+            }
+    
+    except Exception as e:
+        logger.error("Error validating Firebase config: %s", e)
+        return {
+            "valid": False,
+            "error": f"Validation error: {str(e)}"
+        }
+
+async def _validate_weather_impl(
+    config: WeatherConfig,
+    client: httpx.AsyncClient,
+    redis: Optional[Any] = None
+) -> Dict[str, Any]:
+    """Validate Weather API configuration with a sample request"""
+    try:
+        logger.info("Validating Weather API config for endpoint: %s", config.endpoint)
         
-        # Test Firebase configuration by making a request to Firebase REST API
-        async with httpx.AsyncClient() as client:
-            try:
-                # Test with a simple auth request
-                test_url = f"https://identitytoolkit.googleapis.com/v1/accounts:signUp?key={config.apiKey}"
-                response = await client.post(test_url, json={}, timeout=10.0)
-                
-                # If we get a 400 with specific error about missing email, the API key is valid
-                if response.status_code == 400:
-                    error_data = response.json()
-                    if "MISSING_EMAIL" in str(error_data):
-                        return JSONResponse(content={
-                            "valid": True,
-                            "message": "Firebase configuration is valid"
-                        })
-                
-                # Check for invalid API key error
-                if response.status_code == 400:
-                    error_data = response.json()
-                    if "API_KEY_INVALID" in str(error_data):
-                        return JSONResponse(content={
-                            "valid": False,
-                            "error": "Invalid Firebase API key"
-                        })
-                
-                # If we reach here, assume it's valid (Firebase API might be working)
-                return JSONResponse(content={
-                    "valid": True,
-                    "message": "Firebase configuration appears to be valid"
-                })
+        format_error = _check_weather_format(config)
+        if format_error:
+            return format_error
+        
+        try:
+            return await _cached(redis, "weather", config, lambda: _probe_weather(config, client))
                 
-            except httpx.TimeoutException:
-                return JSONResponse(content={
-                    "valid": False,
-                    "error": "Timeout connecting to Firebase. Please check your internet connection."
-                })
-            except Exception as e:
-                logger.error(f"Error testing Firebase API: {e}")
-                # If we can't test, assume it's valid if format is correct
-                return JSONResponse(content={
-                    "valid": True,
-                    "message": "Firebase configuration format is valid (unable to test connectivity)"
-                })
+        except httpx.ConnectTimeout:
+            return {
+                "valid": False,
+                "error": "Timeout connecting to Weather API. Please check your internet connection.",
+                "timeout": "connect"
+            }
+        except httpx.TimeoutException:
+            return {
+                "valid": False,
+                "error": "Timeout waiting for a response from Weather API. Please try again.",
+                "timeout": "read"
+            }
+        except Exception as e:
+            logger.error("Error testing Weather API: %s", e)
+            return {
+                "valid": False,
+                "error": f"Connection error: {str(e)}"
+            }
+    
+    except Exception as e:
+        logger.error("Error validating Weather config: %s", e)
+        return {
+            "valid": False,
+            "error": f"Validation error: {str(e)}"
+        }
+
+async def _validate_kyc_impl(
+    config: KYCConfig,
+    client: httpx.AsyncClient,
+    redis: Optional[Any] = None
+) -> Dict[str, Any]:
+    """Validate KYC API configuration by probing the endpoint"""
+    try:
+        logger.info("Validating KYC API config for endpoint: %s", config.endpoint)
+        
+        format_error = _check_kyc_format(config)
+        if format_error:
+            return format_error
         
+        try:
+            return await _cached(redis, "kyc", config, lambda: _probe_kyc(config, client))
+            
+        except httpx.ConnectTimeout:
+            return {
+                "valid": False,
+                "error": "Timeout connecting to KYC API. Please check the endpoint URL.",
+                "timeout": "connect"
+            }
+        except httpx.TimeoutException:
+            return {
+                "valid": False,
+                "error": "Timeout waiting for a response from KYC API. Please try again.",
+                "timeout": "read"
+            }
+        except Exception as e:
+            logger.error("Error testing KYC API: %s", e)
+            return {
+                "valid": False,
+                "error": f"Connection error: {str(e)}"
+            }
+    
     except Exception as e:
-        logger.error(f"Error validating Firebase config: {e}")
-        return JSONResponse(content={
+        logger.error("Error validating KYC config: %s", e)
+        return {
             "valid": False,
             "error": f"Validation error: {str(e)}"
-        })
+        }
+
+@router.post("/validate-firebase")
+async def validate_firebase_config(
+    config: FirebaseConfig,
+    client: httpx.AsyncClient = Depends(get_http_client),
+    redis: Optional[Any] = Depends(get_redis)
+) -> ORJSONResponse:
+    """
+    Validate Firebase configuration
+    
+    Args:
+        config: Firebase configuration to validate
+        client: Shared HTTP client
+        redis: Validation result cache
+        
+    Returns:
+        JSON response with validation result
+    """
+    return ORJSONResponse(content=await _validate_firebase_impl(config, client, redis))
 
 @router.post("/validate-weather")
-async def validate_weather_config(config: WeatherConfig) -> JSONResponse:
+async def validate_weather_config(
+    config: WeatherConfig,
+    client: httpx.AsyncClient = Depends(get_http_client),
+    redis: Optional[Any] = Depends(get_redis)
+) -> ORJSONResponse:
     """
     Validate Weather API configuration
     
     Args:
         config: Weather API configuration to validate
+        client: Shared HTTP client
+        redis: Validation result cache
         
     Returns:
         JSON response with validation result and sample data
     """
-    try:
-        logger.info(f"Validating Weather API config for endpoint: {config.endpoint}")
-        
-        if not config.apiKey:
-            return JSONResponse(content={
-                "valid": False,
-                "error": "API Key is required"
-            })
-        
-        # Test the weather API with a sample request
-        async with httpx.AsyncClient() as client:
-            try:
-                test_url = f"{config.endpoint}/weather"
-                params = {
-                    "q": config.testLocation,
-                    "appid": config.apiKey,
-                    "units": "metric"
-                }
-                
-                response = await client.get(test_url, params=params, timeout=10.0)
-                
-                if response.status_code == 200:
-                    weather_data = response.json()
-                    return JSONResponse(content={
-                        "valid": True,
-                        "message": "Weather API is working correctly",
-                        "data": weather_data
-                    })
-                elif response.status_code == 401:
-                    return JSONResponse(content={
-                        "valid": False,
-                        "error": "Invalid API key. Please check your OpenWeatherMap API key."
-                    })
-                elif response.status_code == 404:
-                    return JSONResponse(content={
-                        "valid": False,
-                        "error": f"Location '{config.testLocation}' not found. Please check the location format."
-                    })
-                else:
-                    error_data = response.json() if response.headers.get('content-type', '').startswith('application/json') else {}
-                    return JSONResponse(content={
-                        "valid": False,
-                        "error": f"API request failed: {error_data.get('message', f'HTTP {response.status_code}')}"
-                    })
-                    
-            except httpx.TimeoutException:
-                return JSONResponse(content={
-                    "valid": False,
-                    "error": "Timeout connecting to Weather API. Please check your internet connection."
-                })
-            except Exception as e:
-                logger.error(f"Error testing Weather API: {e}")
-                return JSONResponse(content={
-                    "valid": False,
-                    "error": f"Connection error: {str(e)}"
-                })
-        
-    except Exception as e:
-        logger.error(f"Error validating Weather config: {e}")
-        return JSONResponse(content={
-            "valid": False,
-            "error": f"Validation error: {str(e)}"
-        })
+    return ORJSONResponse(content=await _validate_weather_impl(config, client, redis))
 
 @router.post("/validate-kyc")
-async def validate_kyc_config(config: KYCConfig) -> JSONResponse:
+async def validate_kyc_config(
+    config: KYCConfig,
+    client: httpx.AsyncClient = Depends(get_http_client),
+    redis: Optional[Any] = Depends(get_redis)
+) -> ORJSONResponse:
     """
     Validate KYC API configuration
     
     Args:
         config: KYC API configuration to validate
+        client: Shared HTTP client
+        redis: Validation result cache
         
     Returns:
         JSON response with validation result
     """
-    try:
-        logger.info(f"Validating KYC API config for endpoint: {config.endpoint}")
-        
-        if not config.apiKey or not config.endpoint:
-            return JSONResponse(content={
-                "valid": False,
-                "error": "API Key and Endpoint are required"
-            })
-        
-        # Test the KYC API endpoint
-        async with httpx.AsyncClient() as client:
-            try:
-                # Try to make a simple request to test connectivity
-                headers = {
-                    "Authorization": f"Bearer {config.apiKey}",
-                    "Content-Type": "application/json"
-                }
-                
-                if config.authToken:
-                    headers["X-Auth-Token"] = config.authToken
-                
-                # Most KYC APIs have a status or health endpoint
-                test_endpoints = [
-                    f"{config.endpoint}/status",
-                    f"{config.endpoint}/health", 
-                    f"{config.endpoint}/",
-                    config.endpoint
-                ]
-                
-                last_error = None
-                
-                for test_url in test_endpoints:
-                    try:
-                        response = await client.get(test_url, headers=headers, timeout=10.0)
-                        
-                        if response.status_code in [200, 401, 403]:
-                            # 200 = success, 401/403 = auth issue but endpoint exists
-                            if response.status_code == 200:
-                                return JSONResponse(content={
-                                    "valid": True,
-                                    "message": "KYC API endpoint is accessible and responding"
-                                })
-                            else:
-                                return JSONResponse(content={
-                                    "valid": True,
-                                    "message": "KYC API endpoint exists (authentication may need adjustment)"
-                                })
-                        
-                    except Exception as e:
-                        last_error = str(e)
-                        continue
-                
-                # If all endpoints failed, try a POST request (some APIs only respond to POST)
-                try:
-                    response = await client.post(
-                        f"{config.endpoint}/verify", 
-                        headers=headers, 
-                        json={"test": True},
-                        timeout=10.0
-                    )
-                    
-                    if response.status_code in [200, 400, 401, 403, 422]:
-                        return JSONResponse(content={
-                            "valid": True,
-                            "message": "KYC API endpoint is accessible"
-                        })
-                        
-                except Exception:
-                    pass
-                
-                return JSONResponse(content={
-                    "valid": False,
-                    "error": f"Unable to connect to KYC API endpoint. Last error: {last_error or 'Connection failed'}"
-                })
-                
-            except httpx.TimeoutException:
-                return JSONResponse(content={
-                    "valid": False,
-                    "error": "Timeout connecting to KYC API. Please check the endpoint URL."
-                })
-            except Exception as e:
-                logger.error(f"Error testing KYC API: {e}")
-                return JSONResponse(content={
-                    "valid": False,
-                    "error": f"Connection error: {str(e)}"
-                })
-        
-    except Exception as e:
-        logger.error(f"Error validating KYC config: {e}")
-        return JSONResponse(content={
-            "valid": False,
-            "error": f"Validation error: {str(e)}"
-        })
+    return ORJSONResponse(content=await _validate_kyc_impl(config, client, redis))
 
 @router.post("/validate-all")
-async def validate_all_configurations(config: FullConfiguration) -> JSONResponse:
+async def validate_all_configurations(
+    config: FullConfiguration,
+    client: httpx.AsyncClient = Depends(get_http_client),
+    redis: Optional[Any] = Depends(get_redis)
+) -> ORJSONResponse:
     """
     Validate all API configurations at once
     
     Args:
         config: Complete configuration to validate
+        client: Shared HTTP client
+        redis: Validation result cache
         
     Returns:
         JSON response with validation results for all services
@@ -314,156 +544,145 @@ async def validate_all_configurations(config: FullConfiguration) -> JSONResponse
     try:
         logger.info("Validating all API configurations")
         
-        # Run all validations concurrently
-        firebase_task = validate_firebase_config(config.firebase)
-        weather_task = validate_weather_config(config.weather)
-        kyc_task = validate_kyc_config(config.kyc)
-        
-        # Wait for all validations to complete
-        firebase_result, weather_result, kyc_result = await asyncio.gather(
-            firebase_task, weather_task, kyc_task, return_exceptions=True
-        )
-        
-        # Process results
-        results = {}
-        
-        # Firebase result
-        if isinstance(firebase_result, JSONResponse):
-            firebase_data = firebase_result.body.decode() if hasattr(firebase_result, 'body') else '{}'
-            try:
-                import json
-                results['firebase'] = json.loads(firebase_data)
-            except:
-                results['firebase'] = {"valid": False, "error": "Validation failed"}
-        else:
-            results['firebase'] = {"valid": False, "error": str(firebase_result)}
-        
-        # Weather result
-        if isinstance(weather_result, JSONResponse):
-            weather_data = weather_result.body.decode() if hasattr(weather_result, 'body') else '{}'
-            try:
-                import json
-                results['weather'] = json.loads(weather_data)
-            except:
-                results['weather'] = {"valid": False, "error": "Validation failed"}
-        else:
-            results['weather'] = {"valid": False, "error": str(weather_result)}
+        # Run the validations concurrently; each one does its own format check
+        # and returns early, without probing upstream, when it fails
+        pending = {
+            "firebase": _validate_firebase_impl(config.firebase, client, redis),
+            "weather": _validate_weather_impl(config.weather, client, redis),
+            "kyc": _validate_kyc_impl(config.kyc, client, redis),
+        }
+        probed = await asyncio.gather(*pending.values(), return_exceptions=True)
+        results: Dict[str, Any] = dict(zip(pending.keys(), probed))
         
-        # KYC result
-        if isinstance(kyc_result, JSONResponse):
-            kyc_data = kyc_result.body.decode() if hasattr(kyc_result, 'body') else '{}'
-            try:
-                import json
-                results['kyc'] = json.loads(kyc_data)
-            except:
-                results['kyc'] = {"valid": False, "error": "Validation failed"}
-        else:
-            results['kyc'] = {"valid": False, "error": str(kyc_result)}
+        for service, result in results.items():
+            if isinstance(result, Exception):
+                results[service] = {"valid": False, "error": str(result)}
         
         # Calculate overall status
         valid_services = sum(1 for result in results.values() if result.get('valid', False))
         total_services = len(results)
         
-        return JSONResponse(content={
+        return ORJSONResponse(content={
             "overall_status": "success" if valid_services == total_services else "partial",
             "valid_services": valid_services,
             "total_services": total_services,
             "results": results,
-            "timestamp": datetime.now().isoformat()
+            "timestamp": now_iso()
         })
         
     except Exception as e:
-        logger.error(f"Error validating all configurations: {e}")
-        return JSONResponse(content={
+        logger.error("Error validating all configurations: %s", e)
+        return ORJSONResponse(content={
             "overall_status": "error",
             "error": f"Validation error: {str(e)}",
-            "timestamp": datetime.now().isoformat()
+            "timestamp": now_iso()
         })
 
+# Static responses, serialized once at import
+SERVICE_PROVIDERS: Dict[str, Any] = {
+    "firebase": {
+        "name": "Firebase",
+        "description": "Google's mobile and web application development platform",
+        "website": "https://firebase.google.com",
+        "signup_url": "https://console.firebase.google.com",
+        "documentation": "https://firebase.google.com/docs"
+    },
+    "weather": {
+        "name": "OpenWeatherMap",
+        "description": "Weather data and forecast API service",
+        "website": "https://openweathermap.org",
+        "signup_url": "https://home.openweathermap.org/users/sign_up",
+        "documentation": "https://openweathermap.org/api"
+    },
+    "kyc_providers": [
+        {
+            "id": "aadhaarapi",
+            "name": "AadhaarAPI.com",
+            "description": "Aadhaar verification and KYC services",
+            "website": "https://aadhaarapi.com",
+            "documentation": "https://aadhaarapi.com/docs"
+        },
+        {
+            "id": "signzy",
+            "name": "Signzy",
+            "description": "Digital onboarding and identity verification",
+            "website": "https://signzy.com",
+            "documentation": "https://docs.signzy.com"
+        },
+        {
+            "id": "hyperverge",
+            "name": "HyperVerge",
+            "description": "AI-powered identity verification",
+            "website": "https://hyperverge.co",
+            "documentation": "https://docs.hyperverge.co"
+        }
+    ]
+}
+_PROVIDERS_BYTES = orjson.dumps(SERVICE_PROVIDERS)
+# Only the timestamp changes between health checks
+_HEALTH_TEMPLATE = orjson.dumps({
+    "status": "healthy",
+    "service": "configuration",
+    "supported_services": ["firebase", "weather", "kyc"],
+    "timestamp": "%s"
+})
+
 @router.get("/health")
-async def health_check() -> JSONResponse:
+async def health_check() -> Response:
     """Health check endpoint for configuration service"""
-    return JSONResponse(content={
-        "status": "healthy",
-        "service": "configuration",
-        "supported_services": ["firebase", "weather", "kyc"],
-        "timestamp": datetime.now().isoformat()
-    })
+    return Response(
+        content=_HEALTH_TEMPLATE % now_iso().encode(),
+        media_type="application/json"
+    )
 
 @router.get("/providers")
-async def get_service_providers() -> JSONResponse:
+async def get_service_providers() -> Response:
     """Get list of supported service providers"""
-    return JSONResponse(content={
-        "firebase": {
-            "name": "Firebase",
-            "description": "Google's mobile and web application development platform",
-            "website": "https://firebase.google.com",
-            "signup_url": "https://console.firebase.google.com",
-            "documentation": "https://firebase.google.com/docs"
-        },
-        "weather": {
-            "name": "OpenWeatherMap",
-            "description": "Weather data and forecast API service",
-            "website": "https://openweathermap.org",
-            "signup_url": "https://home.openweathermap.org/users/sign_up",
-            "documentation": "https://openweathermap.org/api"
-        },
-        "kyc_providers": [
-            {
-                "id": "aadhaarapi",
-                "name": "AadhaarAPI.com",
-                "description": "Aadhaar verification and KYC services",
-                "website": "https://aadhaarapi.com",
-                "documentation": "https://aadhaarapi.com/docs"
-            },
-            {
-                "id": "signzy",
-                "name": "Signzy",
-                "description": "Digital onboarding and identity verification",
-                "website": "https://signzy.com",
-                "documentation": "https://docs.signzy.com"
-            },
-            {
-                "id": "hyperverge",
-                "name": "HyperVerge",
-                "description": "AI-powered identity verification",
-                "website": "https://hyperverge.co",
-                "documentation": "https://docs.hyperverge.co"
-            }
-        ]
-    })
+    return Response(
+        content=_PROVIDERS_BYTES,
+        media_type="application/json",
+        headers={"Cache-Control": "public, max-age=60"}
+    )
+
+# Config model and validator for each service accepted by /test-connection
+_DISPATCH: Dict[str, Tuple[type, Callable[..., Awaitable[Dict[str, Any]]]]] = {
+    "firebase": (FirebaseConfig, _validate_firebase_impl),
+    "weather": (WeatherConfig, _validate_weather_impl),
+    "kyc": (KYCConfig, _validate_kyc_impl),
+}
 
 @router.post("/test-connection")
-async def test_service_connection(service: str, config: Dict[str, Any]) -> JSONResponse:
+async def test_service_connection(
+    service: str,
+    config: Dict[str, Any],
+    client: httpx.AsyncClient = Depends(get_http_client),
+    redis: Optional[Any] = Depends(get_redis)
+) -> ORJSONResponse:
     """
     Test connection to a specific service
     
     Args:
         service: Service name (firebase, weather, kyc)
         config: Service configuration
+        client: Shared HTTP client
+        redis: Validation result cache
         
     Returns:
         JSON response with connection test result
     """
     try:
-        if service == "firebase":
-            firebase_config = FirebaseConfig(**config)
-            return await validate_firebase_config(firebase_config)
-        elif service == "weather":
-            weather_config = WeatherConfig(**config)
-            return await validate_weather_config(weather_config)
-        elif service == "kyc":
-            kyc_config = KYCConfig(**config)
-            return await validate_kyc_config(kyc_config)
-        else:
-            return JSONResponse(content={
+        model_cls, validate = _DISPATCH.get(service, (None, None))
+        if validate is None:
+            return ORJSONResponse(content={
                 "valid": False,
                 "error": f"Unknown service: {service}"
             })
-            
+        
+        return ORJSONResponse(content=await validate(model_cls(**config), client, redis))
+        
     except Exception as e:
-        logger.error(f"Error testing {service} connection: {e}")
-        return JSONResponse(content={
+        logger.error("Error testing %s connection: %s", service, e)
+        return ORJSONResponse(content={
             "valid": False,
             "error": f"Connection test failed: {str(e)}"
         })
\ No newline at end of file
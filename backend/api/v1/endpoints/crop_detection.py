@@ -1,16 +1,21 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException, Depends
+from fastapi import APIRouter, UploadFile, File, HTTPException, Depends, Request
 from typing import Dict, Any
 import asyncio
+import numpy as np
 from loguru import logger
 
 from models.model_loader import model_loader
 from utils.image_utils import image_processor
+from utils.uploads import enforce_upload_limit
+from utils.cv_jobs import run_cv_job
 from config.settings import settings
+from utils.responses import NumpyORJSONResponse
 
 router = APIRouter()
 
-@router.post("/analyze", response_model=Dict[str, Any])
+@router.post("/analyze", response_model=Dict[str, Any], response_class=NumpyORJSONResponse)
 async def analyze_crop_health(
+    request: Request,
     file: UploadFile = File(..., description="Crop image for health analysis")
 ) -> Dict[str, Any]:
     """
@@ -25,23 +30,29 @@ async def analyze_crop_health(
     try:
         logger.info(f"Starting crop health analysis for file: {file.filename}")
         
-        # Validate and load image
+        # Validate and load image, rejecting oversized uploads up front
+        await enforce_upload_limit(file)
         image = await image_processor.validate_and_load_image(file)
         
         # Preprocess image for MATLAB model
-        processed_image = model_loader.preprocess_image(image, "crop_health")
+        processed_image = await run_cv_job(request, model_loader.preprocess_image, image, "crop_health")
         
-        # Make prediction using MATLAB model
-        prediction_result = model_loader.predict(processed_image, "crop_health")
+        # Make prediction using MATLAB model (batched with concurrent
+        # requests) and extract image features for additional analysis.
+        # Only the feature job takes a CV slot; the batcher bounds its own
+        # work with max_batch, so waiting requests can all join one batch
+        prediction_result, image_features = await asyncio.gather(
+            request.app.state.crop_batcher.predict(processed_image[0]),
+            run_cv_job(request, image_processor.extract_image_features, processed_image[0])
+        )
         
-        # Extract image features for additional analysis
-        image_features = image_processor.extract_image_features(processed_image[0])
+        image_quality = _assess_image_quality(image_features)
         
         # Generate recommendations based on prediction
         recommendations = _generate_crop_recommendations(
             prediction_result["prediction"],
             prediction_result["confidence"],
-            image_features
+            image_quality
         )
         
         # Compile response
@@ -50,13 +61,14 @@ async def analyze_crop_health(
             "prediction": prediction_result["prediction"],
             "confidence": round(prediction_result["confidence"], 3),
             "threshold_met": prediction_result["threshold_met"],
-            "class_probabilities": {
-                k: round(v, 3) for k, v in prediction_result["class_probabilities"].items()
-            },
+            "class_probabilities": dict(zip(
+                prediction_result["class_names"],
+                np.round(prediction_result["probabilities"], 3).tolist()
+            )),
             "analysis": {
                 "health_status": _determine_health_status(prediction_result["prediction"]),
                 "severity": _calculate_severity(prediction_result),
-                "image_quality": _assess_image_quality(image_features)
+                "image_quality": image_quality
             },
             "recommendations": recommendations,
             "model_info": {
@@ -68,7 +80,8 @@ async def analyze_crop_health(
         }
         
         logger.info(f"Crop health analysis completed: {prediction_result['prediction']} ({prediction_result['confidence']:.3f})")
-        return response
+        # Returned directly so numpy-typed features skip jsonable_encoder
+        return NumpyORJSONResponse(content=response)
         
     except HTTPException:
         raise
@@ -114,7 +127,7 @@ def _assess_image_quality(features: Dict[str, Any]) -> str:
     else:
         return "poor"
 
-def _generate_crop_recommendations(prediction: str, confidence: float, features: Dict[str, Any]) -> list:
+def _generate_crop_recommendations(prediction: str, confidence: float, image_quality: str) -> list:
     """Generate actionable recommendations based on analysis results"""
     recommendations = []
     
@@ -157,7 +170,6 @@ def _generate_crop_recommendations(prediction: str, confidence: float, features:
         recommendations.append("Consider taking additional photos from different angles for better analysis")
     
     # Add image quality recommendations
-    image_quality = _assess_image_quality(features)
     if image_quality in ["fair", "poor"]:
         recommendations.extend([
             "Retake photo with better lighting conditions",
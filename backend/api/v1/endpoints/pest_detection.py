@@ -4,9 +4,11 @@ from loguru import logger
 
 from models.model_loader import model_loader
 from utils.image_utils import image_processor
+from utils.uploads import enforce_upload_limit
 from config.settings import settings
+from utils.responses import NumpyORJSONResponse
 
-router = APIRouter()
+router = APIRouter(default_response_class=NumpyORJSONResponse)
 
 @router.post("/analyze", response_model=Dict[str, Any])
 async def detect_pests(
@@ -24,7 +26,8 @@ async def detect_pests(
     try:
         logger.info(f"Starting pest detection for file: {file.filename}")
         
-        # Validate and load image
+        # Validate and load image, rejecting oversized uploads up front
+        await enforce_upload_limit(file)
         image = await image_processor.validate_and_load_image(file)
         
         # Preprocess image for MATLAB model
@@ -70,7 +73,9 @@ async def detect_pests(
         }
         
         logger.info(f"Pest detection completed: {prediction_result['prediction']} ({prediction_result['confidence']:.3f})")
-        return response
+        # Built from model output, so returned directly instead of being
+        # re-validated against response_model and passed through jsonable_encoder
+        return NumpyORJSONResponse(content=response)
         
     except HTTPException:
         raise
@@ -1,22 +1,154 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException
-from typing import Dict, Any
+from fastapi import APIRouter, UploadFile, File, HTTPException, Query, Request
+from typing import Dict, Any, List
+from types import MappingProxyType
+import asyncio
+import functools
+import numpy as np
 from loguru import logger
 
 from models.model_loader import model_loader
 from utils.image_utils import image_processor
+from utils.uploads import enforce_upload_limit
+from utils.cv_jobs import run_cv_job
 from config.settings import settings
+from utils.responses import NumpyORJSONResponse
 
-router = APIRouter()
+router = APIRouter(default_response_class=NumpyORJSONResponse)
+
+# Resolved once; settings do not change while the app is running
+_CONF_THRESHOLD: float = settings.CONFIDENCE_THRESHOLD
+
+# Base properties for each soil type
+_SOIL_PROPERTIES = MappingProxyType({
+    "clay": MappingProxyType({
+        "drainage": "poor",
+        "water_retention": "high",
+        "nutrient_retention": "high",
+        "workability": "difficult",
+        "ph_tendency": "neutral_to_alkaline",
+        "organic_matter": "moderate"
+    }),
+    "sandy": MappingProxyType({
+        "drainage": "excellent",
+        "water_retention": "low",
+        "nutrient_retention": "low",
+        "workability": "easy",
+        "ph_tendency": "acidic",
+        "organic_matter": "low"
+    }),
+    "loamy": MappingProxyType({
+        "drainage": "good",
+        "water_retention": "moderate",
+        "nutrient_retention": "high",
+        "workability": "easy",
+        "ph_tendency": "neutral",
+        "organic_matter": "high"
+    }),
+    "silt": MappingProxyType({
+        "drainage": "moderate",
+        "water_retention": "high",
+        "nutrient_retention": "moderate",
+        "workability": "moderate",
+        "ph_tendency": "neutral",
+        "organic_matter": "moderate"
+    })
+})
+
+# Crop suitability for each soil type
+_SUITABILITY_MAP = MappingProxyType({
+    "clay": MappingProxyType({
+        "excellent": ("rice", "wheat", "cotton"),
+        "good": ("soybeans", "corn", "sugarcane"),
+        "fair": ("vegetables", "fruits"),
+        "poor": ("root_vegetables", "sandy_crops"),
+        "irrigation_needs": "low_to_moderate",
+        "fertilizer_efficiency": "high"
+    }),
+    "sandy": MappingProxyType({
+        "excellent": ("carrots", "radishes", "potatoes"),
+        "good": ("tomatoes", "peppers", "herbs"),
+        "fair": ("corn", "soybeans"),
+        "poor": ("rice", "heavy_feeders"),
+        "irrigation_needs": "high",
+        "fertilizer_efficiency": "low"
+    }),
+    "loamy": MappingProxyType({
+        "excellent": ("most_vegetables", "fruits", "grains"),
+        "good": ("all_major_crops",),
+        "fair": (),
+        "poor": (),
+        "irrigation_needs": "moderate",
+        "fertilizer_efficiency": "high"
+    }),
+    "silt": MappingProxyType({
+        "excellent": ("vegetables", "small_grains"),
+        "good": ("corn", "soybeans", "wheat"),
+        "fair": ("root_crops",),
+        "poor": ("crops_needing_drainage",),
+        "irrigation_needs": "low_to_moderate",
+        "fertilizer_efficiency": "moderate"
+    })
+})
+
+# Type-specific soil management recommendations
+_RECS_BY_TYPE = MappingProxyType({
+    "clay": (
+        "Improve drainage with organic matter addition",
+        "Avoid working soil when wet to prevent compaction",
+        "Consider raised beds for better drainage",
+        "Add compost or aged manure to improve structure",
+        "Plant cover crops to improve soil biology"
+    ),
+    "sandy": (
+        "Increase organic matter to improve water retention",
+        "Use mulch to reduce water evaporation",
+        "Apply fertilizers in smaller, frequent doses",
+        "Consider drip irrigation for water efficiency",
+        "Plant nitrogen-fixing cover crops"
+    ),
+    "loamy": (
+        "Maintain current soil management practices",
+        "Continue regular organic matter additions",
+        "Monitor soil pH and nutrient levels",
+        "Practice crop rotation for soil health",
+        "Protect soil with cover crops during off-season"
+    ),
+    "silt": (
+        "Prevent erosion with proper ground cover",
+        "Avoid overwatering to prevent waterlogging",
+        "Add organic matter to improve structure",
+        "Consider contour farming on slopes",
+        "Monitor for compaction issues"
+    )
+})
+
+# Image quality label by number of quality checks passed (0-3)
+_QUALITY_LABELS = ("poor", "fair", "good", "excellent")
+
+# Drainage-specific recommendations
+_DRAINAGE_RECS = MappingProxyType({
+    "poor": ("Install drainage tiles or create drainage channels",),
+    "excellent": ("Implement water conservation practices",)
+})
+
+# Added when the prediction is below the confidence threshold
+_LOW_CONFIDENCE_RECS = (
+    "Consider professional soil testing for accurate analysis",
+    "Take multiple soil samples from different areas"
+)
 
 @router.post("/analyze", response_model=Dict[str, Any])
 async def analyze_soil_type(
-    file: UploadFile = File(..., description="Soil image for type analysis")
+    request: Request,
+    file: UploadFile = File(..., description="Soil image for type analysis"),
+    include_features: bool = Query(False, description="Include the full image feature set in the response")
 ) -> Dict[str, Any]:
     """
     Analyze soil type using MATLAB-based AI model
     
     Args:
         file: Uploaded image file of the soil
+        include_features: Run full feature extraction and return the features
         
     Returns:
         Dictionary containing soil analysis results and recommendations
@@ -24,161 +156,230 @@ async def analyze_soil_type(
     try:
         logger.info(f"Starting soil analysis for file: {file.filename}")
         
-        # Validate and load image
-        image = await image_processor.validate_and_load_image(file)
+        # Same pooled path as /analyze-batch, with a batch of one
+        [outcome] = await _analyze_soil_files(request, [file], include_features)
+        if isinstance(outcome, BaseException):
+            raise outcome
+        prediction_result, image_features = outcome
         
-        # Preprocess image for MATLAB model
-        processed_image = model_loader.preprocess_image(image, "soil_analysis")
+        response = _build_soil_response(prediction_result, image_features, include_features)
         
-        # Make prediction using MATLAB model
-        prediction_result = model_loader.predict(processed_image, "soil_analysis")
+        logger.info(f"Soil analysis completed: {prediction_result['prediction']} ({prediction_result['confidence']:.3f})")
+        # Returned directly so numpy-typed features skip jsonable_encoder
+        return NumpyORJSONResponse(content=response)
         
-        # Extract image features for additional analysis
-        image_features = image_processor.extract_image_features(processed_image[0])
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error in soil analysis: {e}")
+        raise HTTPException(status_code=500, detail="Internal server error during analysis")
+
+@router.post("/analyze-batch", response_model=Dict[str, Any])
+async def analyze_soil_batch(
+    request: Request,
+    files: List[UploadFile] = File(..., description="Soil images for type analysis"),
+    include_features: bool = Query(False, description="Include the full image feature set in each result")
+) -> Dict[str, Any]:
+    """
+    Analyze several soil images with a single batched model call
+    
+    Args:
+        files: Uploaded soil images
+        include_features: Run full feature extraction and return the features
         
-        # Generate soil-specific analysis
-        soil_properties = _analyze_soil_properties(
-            prediction_result["prediction"],
-            prediction_result["class_probabilities"],
-            image_features
+    Returns:
+        Dictionary with one analysis result per image, in upload order;
+        images that could not be loaded get an error entry instead
+    """
+    if len(files) > settings.INFERENCE_BATCH_MAX_SIZE:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Too many images. Maximum batch size is {settings.INFERENCE_BATCH_MAX_SIZE}"
         )
+    
+    try:
+        logger.info(f"Starting batch soil analysis for {len(files)} files")
         
-        # Generate recommendations
-        recommendations = _generate_soil_recommendations(
-            prediction_result["prediction"],
-            prediction_result["confidence"],
-            soil_properties
-        )
+        results = []
+        for file, outcome in zip(files, await _analyze_soil_files(request, files, include_features)):
+            if isinstance(outcome, BaseException):
+                results.append(_batch_item_error(file, outcome))
+                continue
+            prediction_result, features = outcome
+            result = _build_soil_response(prediction_result, features, include_features)
+            result["filename"] = file.filename
+            results.append(result)
         
-        # Compile response
-        response = {
+        logger.info(f"Batch soil analysis completed for {len(results)} files")
+        return NumpyORJSONResponse(content={
             "status": "success",
-            "prediction": prediction_result["prediction"],
-            "confidence": round(prediction_result["confidence"], 3),
-            "threshold_met": prediction_result["threshold_met"],
-            "class_probabilities": {
-                k: round(v, 3) for k, v in prediction_result["class_probabilities"].items()
-            },
-            "soil_analysis": {
-                "primary_type": prediction_result["prediction"],
-                "properties": soil_properties,
-                "suitability": _assess_crop_suitability(prediction_result["prediction"]),
-                "image_quality": _assess_image_quality(image_features)
-            },
-            "recommendations": recommendations,
-            "model_info": {
-                "name": "soil_analysis",
-                "version": prediction_result["model_version"],
-                "confidence_threshold": settings.CONFIDENCE_THRESHOLD
-            },
-            "image_features": image_features
-        }
-        
-        logger.info(f"Soil analysis completed: {prediction_result['prediction']} ({prediction_result['confidence']:.3f})")
-        return response
+            "count": len(results),
+            "results": results
+        })
         
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Error in soil analysis: {e}")
+        logger.error(f"Error in batch soil analysis: {e}")
         raise HTTPException(status_code=500, detail="Internal server error during analysis")
 
-def _analyze_soil_properties(soil_type: str, probabilities: Dict[str, float], features: Dict[str, Any]) -> Dict[str, Any]:
-    """Analyze soil properties based on type and image features"""
+async def _analyze_soil_files(
+    request: Request,
+    files: List[UploadFile],
+    include_features: bool
+) -> List[Any]:
+    """
+    Analyze uploads with one batched model call
     
-    # Base properties for each soil type
-    soil_properties = {
-        "clay": {
-            "drainage": "poor",
-            "water_retention": "high",
-            "nutrient_retention": "high",
-            "workability": "difficult",
-            "ph_tendency": "neutral_to_alkaline",
-            "organic_matter": "moderate"
-        },
-        "sandy": {
-            "drainage": "excellent",
-            "water_retention": "low",
-            "nutrient_retention": "low",
-            "workability": "easy",
-            "ph_tendency": "acidic",
-            "organic_matter": "low"
-        },
-        "loamy": {
-            "drainage": "good",
-            "water_retention": "moderate",
-            "nutrient_retention": "high",
-            "workability": "easy",
-            "ph_tendency": "neutral",
-            "organic_matter": "high"
+    Every image is validated, loaded and preprocessed on its own so one bad
+    upload is reported for that item instead of failing the rest. Each pool
+    job holds its own CV slot.
+    
+    Returns:
+        Per upload, in order: (prediction_result, image_features), or the
+        exception that stopped it from being analyzed
+    """
+    prepared = await asyncio.gather(
+        *(_prepare_soil_image(request, file) for file in files),
+        return_exceptions=True
+    )
+    valid = [item for item in prepared if not isinstance(item, BaseException)]
+    if not valid:
+        return prepared
+    
+    # Stack the valid images along the batch axis for one model call; by
+    # default only the scalars the soil analysis reads are extracted
+    processed = np.stack(valid)
+    extract = image_processor.extract_image_features if include_features else _extract_quality_features
+    prediction_results, *image_features = await asyncio.gather(
+        run_cv_job(request, model_loader.predict_batch, processed, "soil_analysis"),
+        *(run_cv_job(request, extract, image) for image in processed)
+    )
+    
+    analyses = iter(zip(prediction_results, image_features))
+    return [item if isinstance(item, BaseException) else next(analyses) for item in prepared]
+
+async def _prepare_soil_image(request: Request, file: UploadFile) -> np.ndarray:
+    """Validate, load and preprocess one upload (without the batch axis)"""
+    await enforce_upload_limit(file)
+    image = await image_processor.validate_and_load_image(file)
+    processed = await run_cv_job(request, model_loader.preprocess_image, image, "soil_analysis")
+    return processed[0]
+
+def _batch_item_error(file: UploadFile, error: BaseException) -> Dict[str, Any]:
+    """Result entry for a batch upload that could not be analyzed"""
+    if isinstance(error, HTTPException):
+        detail = error.detail
+    else:
+        logger.error(f"Error preparing {file.filename} for batch soil analysis: {error}")
+        detail = "Could not process image"
+    return {"status": "error", "filename": file.filename, "detail": detail}
+
+def _build_soil_response(
+    prediction_result: Dict[str, Any],
+    image_features: Dict[str, Any],
+    include_features: bool
+) -> Dict[str, Any]:
+    """Assemble the analysis response for one soil image"""
+    # Generate soil-specific analysis
+    soil_properties = _analyze_soil_properties(
+        prediction_result["prediction"],
+        prediction_result["class_probabilities"],
+        image_features
+    )
+    
+    # Generate recommendations
+    recommendations = _generate_soil_recommendations(
+        prediction_result["prediction"],
+        prediction_result["confidence"],
+        soil_properties
+    )
+    
+    # Compile response
+    response = {
+        "status": "success",
+        "prediction": prediction_result["prediction"],
+        "confidence": round(prediction_result["confidence"], 3),
+        "threshold_met": prediction_result["threshold_met"],
+        "class_probabilities": dict(zip(
+            prediction_result["class_names"],
+            np.round(prediction_result["probabilities"], 3).tolist()
+        )),
+        "soil_analysis": {
+            "primary_type": prediction_result["prediction"],
+            "properties": soil_properties,
+            "suitability": _assess_crop_suitability(prediction_result["prediction"]),
+            "image_quality": _assess_image_quality(image_features)
         },
-        "silt": {
-            "drainage": "moderate",
-            "water_retention": "high",
-            "nutrient_retention": "moderate",
-            "workability": "moderate",
-            "ph_tendency": "neutral",
-            "organic_matter": "moderate"
+        "recommendations": recommendations,
+        "model_info": {
+            "name": "soil_analysis",
+            "version": prediction_result["model_version"],
+            "confidence_threshold": _CONF_THRESHOLD
         }
     }
+    if include_features:
+        response["image_features"] = image_features
+    
+    return response
+
+def _extract_quality_features(image: np.ndarray) -> Dict[str, float]:
+    """
+    Compute only the features the soil analysis uses
+    
+    Args:
+        image: Preprocessed RGB image with values in [0, 1]
+        
+    Returns:
+        mean_brightness (0-255), contrast (0-1) and sharpness (Laplacian variance)
+    """
+    # Full resolution: Laplacian variance depends on scale, and the
+    # _assess_image_quality thresholds are for full-size features
+    gray = image.mean(axis=-1) * 255.0
     
-    base_props = soil_properties.get(soil_type, soil_properties["loamy"])
+    laplacian = (
+        gray[:-2, 1:-1] + gray[2:, 1:-1] + gray[1:-1, :-2] + gray[1:-1, 2:]
+        - 4.0 * gray[1:-1, 1:-1]
+    )
     
+    return {
+        "mean_brightness": float(gray.mean()),
+        "contrast": float(gray.std() / 255.0),
+        "sharpness": float(laplacian.var())
+    }
+
+def _analyze_soil_properties(soil_type: str, probabilities: Dict[str, float], features: Dict[str, Any]) -> Dict[str, Any]:
+    """Analyze soil properties based on type and image features"""
     # Adjust properties based on image analysis
     brightness = features.get("mean_brightness", 128)
     
-    # Estimate organic matter from image darkness
-    if brightness < 80:
+    # Estimate organic matter from image darkness: 0 dark, 1 normal, 2 light
+    brightness_bucket = 0 if brightness < 80 else 2 if brightness > 150 else 1
+    
+    # Add confidence-based adjustments
+    mixed_soil = max(probabilities.values()) < 0.7
+    
+    # Fresh dict per call; the cached items are shared
+    return dict(_soil_properties_items(soil_type, brightness_bucket, mixed_soil))
+
+@functools.lru_cache(maxsize=64)
+def _soil_properties_items(soil_type: str, brightness_bucket: int, mixed_soil: bool) -> tuple:
+    """Soil properties as (key, value) pairs for one combination of inputs"""
+    base_props = dict(_SOIL_PROPERTIES.get(soil_type, _SOIL_PROPERTIES["loamy"]))
+    
+    if brightness_bucket == 0:
         base_props["organic_matter"] = "high"
-    elif brightness > 150:
+    elif brightness_bucket == 2:
         base_props["organic_matter"] = "low"
     
-    # Add confidence-based adjustments
-    max_prob = max(probabilities.values())
-    if max_prob < 0.7:
+    if mixed_soil:
         base_props["analysis_confidence"] = "mixed_soil_type_detected"
     
-    return base_props
+    return tuple(base_props.items())
 
 def _assess_crop_suitability(soil_type: str) -> Dict[str, Any]:
     """Assess crop suitability for different soil types"""
-    
-    suitability_map = {
-        "clay": {
-            "excellent": ["rice", "wheat", "cotton"],
-            "good": ["soybeans", "corn", "sugarcane"],
-            "fair": ["vegetables", "fruits"],
-            "poor": ["root_vegetables", "sandy_crops"],
-            "irrigation_needs": "low_to_moderate",
-            "fertilizer_efficiency": "high"
-        },
-        "sandy": {
-            "excellent": ["carrots", "radishes", "potatoes"],
-            "good": ["tomatoes", "peppers", "herbs"],
-            "fair": ["corn", "soybeans"],
-            "poor": ["rice", "heavy_feeders"],
-            "irrigation_needs": "high",
-            "fertilizer_efficiency": "low"
-        },
-        "loamy": {
-            "excellent": ["most_vegetables", "fruits", "grains"],
-            "good": ["all_major_crops"],
-            "fair": [],
-            "poor": [],
-            "irrigation_needs": "moderate",
-            "fertilizer_efficiency": "high"
-        },
-        "silt": {
-            "excellent": ["vegetables", "small_grains"],
-            "good": ["corn", "soybeans", "wheat"],
-            "fair": ["root_crops"],
-            "poor": ["crops_needing_drainage"],
-            "irrigation_needs": "low_to_moderate",
-            "fertilizer_efficiency": "moderate"
-        }
-    }
-    
-    return suitability_map.get(soil_type, suitability_map["loamy"])
+    return dict(_SUITABILITY_MAP.get(soil_type, _SUITABILITY_MAP["loamy"]))
 
 def _assess_image_quality(features: Dict[str, Any]) -> str:
     """Assess soil image quality for analysis reliability"""
@@ -186,82 +387,50 @@ def _assess_image_quality(features: Dict[str, Any]) -> str:
     contrast = features.get("contrast", 0)
     brightness = features.get("mean_brightness", 128)
     
-    # Soil images should have good contrast and moderate brightness
-    quality_score = 0
-    
-    if 50 < brightness < 200:  # Good brightness range for soil
-        quality_score += 1
-    if sharpness > 30:  # Adequate sharpness
-        quality_score += 1
-    if contrast > 0.15:  # Good contrast
-        quality_score += 1
-    
-    if quality_score == 3:
-        return "excellent"
-    elif quality_score == 2:
-        return "good"
-    elif quality_score == 1:
-        return "fair"
-    else:
-        return "poor"
+    # Soil images should have good contrast and moderate brightness;
+    # one point each for brightness range, sharpness and contrast
+    # (int() since numpy bools would OR together instead of adding up)
+    quality_score = (
+        int(50 < brightness < 200)
+        + int(sharpness > 30)
+        + int(contrast > 0.15)
+    )
+    return _QUALITY_LABELS[quality_score]
 
-def _generate_soil_recommendations(soil_type: str, confidence: float, properties: Dict[str, Any]) -> list:
-    """Generate soil management recommendations"""
-    recommendations = []
-    
+def _build_soil_recommendations(soil_type: str, drainage: str, low_confidence: bool) -> tuple:
+    """Assemble the recommendations for one (soil type, drainage, confidence) case"""
     # Type-specific recommendations
-    if soil_type == "clay":
-        recommendations.extend([
-            "Improve drainage with organic matter addition",
-            "Avoid working soil when wet to prevent compaction",
-            "Consider raised beds for better drainage",
-            "Add compost or aged manure to improve structure",
-            "Plant cover crops to improve soil biology"
-        ])
-    
-    elif soil_type == "sandy":
-        recommendations.extend([
-            "Increase organic matter to improve water retention",
-            "Use mulch to reduce water evaporation",
-            "Apply fertilizers in smaller, frequent doses",
-            "Consider drip irrigation for water efficiency",
-            "Plant nitrogen-fixing cover crops"
-        ])
-    
-    elif soil_type == "loamy":
-        recommendations.extend([
-            "Maintain current soil management practices",
-            "Continue regular organic matter additions",
-            "Monitor soil pH and nutrient levels",
-            "Practice crop rotation for soil health",
-            "Protect soil with cover crops during off-season"
-        ])
-    
-    elif soil_type == "silt":
-        recommendations.extend([
-            "Prevent erosion with proper ground cover",
-            "Avoid overwatering to prevent waterlogging",
-            "Add organic matter to improve structure",
-            "Consider contour farming on slopes",
-            "Monitor for compaction issues"
-        ])
+    recommendations = _RECS_BY_TYPE.get(soil_type, ())
     
     # Drainage-specific recommendations
-    drainage = properties.get("drainage", "moderate")
-    if drainage == "poor":
-        recommendations.append("Install drainage tiles or create drainage channels")
-    elif drainage == "excellent":
-        recommendations.append("Implement water conservation practices")
+    recommendations += _DRAINAGE_RECS.get(drainage, ())
     
     # Confidence-based recommendations
-    if confidence < settings.CONFIDENCE_THRESHOLD:
-        recommendations.extend([
-            "Consider professional soil testing for accurate analysis",
-            "Take multiple soil samples from different areas"
-        ])
+    if low_confidence:
+        recommendations += _LOW_CONFIDENCE_RECS
     
     return recommendations
 
+def _generate_soil_recommendations(soil_type: str, confidence: float, properties: Dict[str, Any]) -> list:
+    """Generate soil management recommendations"""
+    key = (
+        soil_type,
+        properties.get("drainage", "moderate"),
+        confidence < _CONF_THRESHOLD
+    )
+    recommendations = _RECS_TABLE.get(key)
+    if recommendations is None:
+        recommendations = _build_soil_recommendations(*key)
+    return list(recommendations)
+
+# Every known (soil type, drainage, low confidence) combination, precomputed
+_RECS_TABLE: Dict[tuple, tuple] = {
+    (soil_type, drainage, low_confidence): _build_soil_recommendations(soil_type, drainage, low_confidence)
+    for soil_type in _RECS_BY_TYPE
+    for drainage in {props["drainage"] for props in _SOIL_PROPERTIES.values()}
+    for low_confidence in (False, True)
+}
+
 @router.get("/model-info")
 async def get_soil_model_info() -> Dict[str, Any]:
     """Get information about the soil analysis model"""
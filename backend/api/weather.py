@@ -1,64 +1,187 @@
 from fastapi import APIRouter, HTTPException, Query
-from typing import Optional, Dict, Any
+from fastapi.responses import ORJSONResponse
+from typing import Optional, Dict, Any, Callable, Awaitable
 import httpx
+import orjson
+from cachetools import TTLCache
 from utils.logger import logger
-from config import settings
+from utils.single_flight import single_flight
+from config.settings import settings
 import asyncio
+import time
+import unicodedata
+from decimal import Decimal
 from datetime import datetime, timedelta
+from types import MappingProxyType
 
-router = APIRouter(prefix="/weather", tags=["weather"])
+router = APIRouter(prefix="/weather", tags=["weather"], default_response_class=ORJSONResponse)
+
+# OpenWeatherMap settings, resolved once at import
+_OWM_BASE_URL: str = getattr(settings, 'OPENWEATHER_BASE_URL', 'https://api.openweathermap.org/data/2.5')
+_OWM_KEY: Optional[str] = getattr(settings, 'OPENWEATHER_API_KEY', None)
+# Coordinates are snapped to this grid (degrees) for caching
+_CACHE_GRID: float = settings.WEATHER_CACHE_GRID
+# Decimal places that tell grid cells apart in a cache key (0.05 -> 2)
+_CACHE_KEY_DECIMALS: int = max(0, -Decimal(str(_CACHE_GRID)).normalize().as_tuple().exponent)
+
+# Default coordinates for major Indian cities (keys are normalized city names)
+_INDIAN_CITY_COORDS = MappingProxyType({
+    "delhi": (28.6139, 77.2090),
+    "mumbai": (19.0760, 72.8777),
+    "bangalore": (12.9716, 77.5946),
+    "chennai": (13.0827, 80.2707),
+    "kolkata": (22.5726, 88.3639)
+})
+_DELHI_COORDS = _INDIAN_CITY_COORDS["delhi"]
+
+# Shared default for optional sections missing from API items
+_EMPTY = MappingProxyType({})
+
+# Static part of the fallback current-weather payload
+_FALLBACK_WEATHER_BASE = MappingProxyType({
+    "temperature": 28,
+    "humidity": 65,
+    "pressure": 1013,
+    "wind_speed": 5.2,
+    "wind_direction": 180,
+    "description": "Partly Cloudy",
+    "icon": "02d",
+    "country": "IN",
+    "visibility": 10,
+    "uv_index": None,
+    "fallback": True
+})
+
+# Longest forecast the endpoint serves; fetched and cached once per location
+_MAX_FORECAST_DAYS = 7
+
+# Fallback forecast entries for up to 7 days (8 per day), built once
+_FALLBACK_FORECAST_TEMPLATES = tuple(
+    MappingProxyType({
+        "temperature": 28 + (i % 8 - 4),  # Simulate daily temperature variation
+        "humidity": 65 + (i % 6 - 3),
+        "description": "Partly Cloudy",
+        "wind_speed": 5.2,
+        "precipitation": 0
+    })
+    for i in range(_MAX_FORECAST_DAYS * 8)
+)
 
 class WeatherService:
     """Weather service using OpenWeatherMap API"""
     
-    def __init__(self):
-        self.base_url = getattr(settings, 'OPENWEATHER_BASE_URL', 'https://api.openweathermap.org/data/2.5')
-        self.api_key = getattr(settings, 'OPENWEATHER_API_KEY', None)
-        self.cache = {}
+    def __init__(self, base_url: str = _OWM_BASE_URL, api_key: Optional[str] = _OWM_KEY):
+        self.base_url = base_url
+        self.api_key = api_key
         self.cache_duration = timedelta(minutes=10)  # Cache for 10 minutes
+        # Past cache_duration, entries are still served for this long while
+        # they are refreshed in the background (stale-while-revalidate)
+        self.stale_duration = self.cache_duration * 1.5
+        self.cache_grid = _CACHE_GRID
+        self.cache_key_decimals = _CACHE_KEY_DECIMALS
+        # Entries are (data, fetched_at) and expire once too stale to serve
+        self.cache = TTLCache(maxsize=10000, ttl=self.stale_duration.total_seconds())
+        # Lookups currently hitting the API, so concurrent misses share one call
+        self._inflight: Dict[str, asyncio.Task] = {}
+        # Background refreshes by key, referenced so they are not garbage collected
+        self._refresh_tasks: Dict[str, asyncio.Task] = {}
+        # Long-lived client so requests reuse keep-alive connections
+        self.client = httpx.AsyncClient(
+            base_url=self.base_url,
+            timeout=10.0,
+            http2=True,
+            limits=httpx.Limits(max_keepalive_connections=50, max_connections=200)
+        )
+    
+    async def aclose(self) -> None:
+        """Close the shared HTTP client"""
+        await self.client.aclose()
     
     def _get_cache_key(self, lat: float, lon: float) -> str:
-        """Generate cache key for coordinates"""
-        return f"{lat:.2f},{lon:.2f}"
+        """Generate cache key for coordinates, snapped to the cache grid"""
+        grid = self.cache_grid
+        # Adding 0.0 folds -0.0 into 0.0 so cells on the axes get one key
+        lat = round(lat / grid) * grid + 0.0
+        lon = round(lon / grid) * grid + 0.0
+        decimals = self.cache_key_decimals
+        return f"{lat:.{decimals}f},{lon:.{decimals}f}"
     
-    def _is_cache_valid(self, timestamp: datetime) -> bool:
-        """Check if cache is still valid"""
-        return datetime.now() - timestamp < self.cache_duration
+    @staticmethod
+    def _normalize_city(city: str) -> str:
+        """Normalize a city name so spelling variants share a cache entry"""
+        return unicodedata.normalize("NFKC", city).casefold().strip()
+    
+    async def _get_cached(
+        self,
+        cache_key: str,
+        fetch: Callable[[], Awaitable[Dict[str, Any]]]
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Return cached data for a key, or None on a miss
+        
+        Stale entries are still returned, and a background refresh is
+        started for them unless one is already running.
+        """
+        entry = self.cache.get(cache_key)
+        if entry is None:
+            return None
+        
+        cached_data, fetched_at = entry
+        if (
+            time.monotonic() - fetched_at >= self.cache_duration.total_seconds()
+            and cache_key not in self._refresh_tasks
+            and cache_key not in self._inflight
+        ):
+            task = asyncio.create_task(single_flight(self._inflight, cache_key, fetch))
+            self._refresh_tasks[cache_key] = task
+            task.add_done_callback(lambda done: self._on_refresh_done(cache_key, done))
+        
+        return cached_data
+    
+    def _on_refresh_done(self, cache_key: str, task: asyncio.Task) -> None:
+        """Forget a finished background refresh and log its failure, if any"""
+        self._refresh_tasks.pop(cache_key, None)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(f"Background weather refresh failed for {cache_key}: {task.exception()}")
     
     async def get_weather_by_coordinates(self, lat: float, lon: float) -> Dict[str, Any]:
         """Get weather data by coordinates"""
+        cache_key = self._get_cache_key(lat, lon)
+        fetch = lambda: self._fetch_weather_by_coordinates(lat, lon, cache_key)
+        
+        # Check cache first
+        cached_data = await self._get_cached(cache_key, fetch)
+        if cached_data is not None:
+            logger.info("Returning cached weather data for %s, %s", lat, lon)
+            return cached_data
+        
+        return await single_flight(self._inflight, cache_key, fetch)
+    
+    async def _fetch_weather_by_coordinates(self, lat: float, lon: float, cache_key: str) -> Dict[str, Any]:
+        """Fetch current weather by coordinates from the API and cache it"""
         try:
-            # Check cache first
-            cache_key = self._get_cache_key(lat, lon)
-            if cache_key in self.cache:
-                cached_data, timestamp = self.cache[cache_key]
-                if self._is_cache_valid(timestamp):
-                    logger.info(f"Returning cached weather data for {lat}, {lon}")
-                    return cached_data
-            
             # Make API request
-            async with httpx.AsyncClient(timeout=10.0) as client:
-                response = await client.get(
-                    f"{self.base_url}/weather",
-                    params={
-                        "lat": lat,
-                        "lon": lon,
-                        "appid": self.api_key,
-                        "units": "metric"
-                    }
-                )
+            response = await self.client.get(
+                "/weather",
+                params={
+                    "lat": lat,
+                    "lon": lon,
+                    "appid": self.api_key,
+                    "units": "metric"
+                }
+            )
+            
+            if response.status_code == 200:
+                data = orjson.loads(response.content)
+                weather_data = self._format_weather_data(data)
                 
-                if response.status_code == 200:
-                    data = response.json()
-                    weather_data = self._format_weather_data(data)
-                    
-                    # Cache the result
-                    self.cache[cache_key] = (weather_data, datetime.now())
-                    
-                    return weather_data
-                else:
-                    logger.error(f"Weather API error: {response.status_code}")
-                    return self._get_fallback_weather_data(lat, lon)
+                # Cache the result
+                self.cache[cache_key] = (weather_data, time.monotonic())
+                
+                return weather_data
+            else:
+                logger.error(f"Weather API error: {response.status_code}")
+                return self._get_fallback_weather_data(lat, lon)
                     
         except Exception as e:
             logger.error(f"Weather API request failed: {e}")
@@ -66,36 +189,40 @@ class WeatherService:
     
     async def get_weather_by_city(self, city: str) -> Dict[str, Any]:
         """Get weather data by city name"""
+        city = self._normalize_city(city)
+        fetch = lambda: self._fetch_weather_by_city(city)
+        
+        # Check cache first
+        cached_data = await self._get_cached(city, fetch)
+        if cached_data is not None:
+            logger.info("Returning cached weather data for %s", city)
+            return cached_data
+        
+        return await single_flight(self._inflight, city, fetch)
+    
+    async def _fetch_weather_by_city(self, city: str) -> Dict[str, Any]:
+        """Fetch current weather by normalized city name from the API and cache it"""
         try:
-            # Check cache first
-            cache_key = city.lower()
-            if cache_key in self.cache:
-                cached_data, timestamp = self.cache[cache_key]
-                if self._is_cache_valid(timestamp):
-                    logger.info(f"Returning cached weather data for {city}")
-                    return cached_data
+            response = await self.client.get(
+                "/weather",
+                params={
+                    "q": city,
+                    "appid": self.api_key,
+                    "units": "metric"
+                }
+            )
             
-            async with httpx.AsyncClient(timeout=10.0) as client:
-                response = await client.get(
-                    f"{self.base_url}/weather",
-                    params={
-                        "q": city,
-                        "appid": self.api_key,
-                        "units": "metric"
-                    }
-                )
+            if response.status_code == 200:
+                data = orjson.loads(response.content)
+                weather_data = self._format_weather_data(data)
                 
-                if response.status_code == 200:
-                    data = response.json()
-                    weather_data = self._format_weather_data(data)
-                    
-                    # Cache the result
-                    self.cache[cache_key] = (weather_data, datetime.now())
-                    
-                    return weather_data
-                else:
-                    logger.error(f"Weather API error for city {city}: {response.status_code}")
-                    return self._get_fallback_weather_data_by_city(city)
+                # Cache the result
+                self.cache[city] = (weather_data, time.monotonic())
+                
+                return weather_data
+            else:
+                logger.error(f"Weather API error for city {city}: {response.status_code}")
+                return self._get_fallback_weather_data_by_city(city)
                     
         except Exception as e:
             logger.error(f"Weather API request failed for city {city}: {e}")
@@ -103,24 +230,41 @@ class WeatherService:
     
     async def get_weather_forecast(self, lat: float, lon: float, days: int = 5) -> Dict[str, Any]:
         """Get weather forecast by coordinates"""
+        # One cached forecast per grid cell covers every requested day count
+        cache_key = f"forecast:{self._get_cache_key(lat, lon)}"
+        fetch = lambda: self._fetch_forecast(lat, lon, cache_key)
+        
+        forecast_data = await self._get_cached(cache_key, fetch)
+        if forecast_data is None:
+            forecast_data = await single_flight(self._inflight, cache_key, fetch)
+        
+        return {**forecast_data, "forecasts": forecast_data["forecasts"][:days * 8]}
+    
+    async def _fetch_forecast(self, lat: float, lon: float, cache_key: str) -> Dict[str, Any]:
+        """Fetch the longest supported forecast from the API and cache it"""
+        days = _MAX_FORECAST_DAYS
         try:
-            async with httpx.AsyncClient(timeout=10.0) as client:
-                response = await client.get(
-                    f"{self.base_url}/forecast",
-                    params={
-                        "lat": lat,
-                        "lon": lon,
-                        "appid": self.api_key,
-                        "units": "metric",
-                        "cnt": days * 8  # 8 forecasts per day (3-hour intervals)
-                    }
-                )
+            response = await self.client.get(
+                "/forecast",
+                params={
+                    "lat": lat,
+                    "lon": lon,
+                    "appid": self.api_key,
+                    "units": "metric",
+                    "cnt": days * 8  # 8 forecasts per day (3-hour intervals)
+                }
+            )
+            
+            if response.status_code == 200:
+                data = orjson.loads(response.content)
+                forecast_data = self._format_forecast_data(data, days)
                 
-                if response.status_code == 200:
-                    data = response.json()
-                    return self._format_forecast_data(data, days)
-                else:
-                    return self._get_fallback_forecast_data(days)
+                # Cache the result
+                self.cache[cache_key] = (forecast_data, time.monotonic())
+                
+                return forecast_data
+            else:
+                return self._get_fallback_forecast_data(days)
                     
         except Exception as e:
             logger.error(f"Forecast API request failed: {e}")
@@ -154,17 +298,10 @@ class WeatherService:
     def _format_forecast_data(self, data: Dict, days: int) -> Dict[str, Any]:
         """Format forecast data"""
         try:
-            forecasts = []
-            for item in data["list"][:days * 8]:
-                forecasts.append({
-                    "datetime": item["dt_txt"],
-                    "temperature": round(item["main"]["temp"]),
-                    "humidity": item["main"]["humidity"],
-                    "description": item["weather"][0]["description"].title(),
-                    "icon": item["weather"][0]["icon"],
-                    "wind_speed": round(item.get("wind", {}).get("speed", 0) * 3.6, 1),
-                    "precipitation": item.get("rain", {}).get("3h", 0) + item.get("snow", {}).get("3h", 0)
-                })
+            forecasts = [
+                self._format_forecast_item(item["main"], item["weather"][0], item)
+                for item in data["list"][:days * 8]
+            ]
             
             return {
                 "location": data["city"]["name"],
@@ -176,82 +313,72 @@ class WeatherService:
             logger.error(f"Error formatting forecast data: {e}")
             raise ValueError(f"Invalid forecast data format: {e}")
     
-    def _get_fallback_weather_data(self, lat: float, lon: float) -> Dict[str, Any]:
-        """Provide fallback weather data when API fails"""
+    @staticmethod
+    def _format_forecast_item(main: Dict, weather: Dict, item: Dict) -> Dict[str, Any]:
+        """Format one 3-hour forecast entry (main/weather looked up once by the caller)"""
         return {
-            "temperature": 28,
-            "humidity": 65,
-            "pressure": 1013,
-            "wind_speed": 5.2,
-            "wind_direction": 180,
-            "description": "Partly Cloudy",
-            "icon": "02d",
-            "location": "India",
-            "country": "IN",
-            "visibility": 10,
-            "uv_index": None,
-            "timestamp": datetime.now().isoformat(),
-            "coordinates": {"lat": lat, "lon": lon},
-            "fallback": True
+            "datetime": item["dt_txt"],
+            "temperature": round(main["temp"]),
+            "humidity": main["humidity"],
+            "description": weather["description"].title(),
+            "icon": weather["icon"],
+            "wind_speed": round(item.get("wind", _EMPTY).get("speed", 0) * 3.6, 1),
+            "precipitation": item.get("rain", _EMPTY).get("3h", 0) + item.get("snow", _EMPTY).get("3h", 0)
         }
     
+    def _get_fallback_weather_data(self, lat: float, lon: float) -> Dict[str, Any]:
+        """Provide fallback weather data when API fails"""
+        weather_data = dict(_FALLBACK_WEATHER_BASE)
+        weather_data["location"] = "India"
+        weather_data["timestamp"] = datetime.now().isoformat()
+        weather_data["coordinates"] = {"lat": lat, "lon": lon}
+        return weather_data
+    
     def _get_fallback_weather_data_by_city(self, city: str) -> Dict[str, Any]:
-        """Provide fallback weather data by city when API fails"""
-        # Default coordinates for major Indian cities
-        city_coords = {
-            "delhi": (28.6139, 77.2090),
-            "mumbai": (19.0760, 72.8777),
-            "bangalore": (12.9716, 77.5946),
-            "chennai": (13.0827, 80.2707),
-            "kolkata": (22.5726, 88.3639)
-        }
+        """Provide fallback weather data by normalized city name when API fails"""
+        lat, lon = _INDIAN_CITY_COORDS.get(city, _DELHI_COORDS)  # Default to Delhi
         
-        coords = city_coords.get(city.lower(), (28.6139, 77.2090))  # Default to Delhi
-        
-        return {
-            "temperature": 28,
-            "humidity": 65,
-            "pressure": 1013,
-            "wind_speed": 5.2,
-            "wind_direction": 180,
-            "description": "Partly Cloudy",
-            "icon": "02d",
-            "location": city.title(),
-            "country": "IN",
-            "visibility": 10,
-            "uv_index": None,
-            "timestamp": datetime.now().isoformat(),
-            "coordinates": {"lat": coords[0], "lon": coords[1]},
-            "fallback": True
-        }
+        weather_data = dict(_FALLBACK_WEATHER_BASE)
+        weather_data["location"] = city.title()
+        weather_data["timestamp"] = datetime.now().isoformat()
+        weather_data["coordinates"] = {"lat": lat, "lon": lon}
+        return weather_data
     
     def _get_fallback_forecast_data(self, days: int) -> Dict[str, Any]:
         """Provide fallback forecast data when API fails"""
-        forecasts = []
         base_time = datetime.now()
         
-        for i in range(days * 8):  # 8 forecasts per day
-            forecast_time = base_time + timedelta(hours=i * 3)
-            forecasts.append({
-                "datetime": forecast_time.strftime("%Y-%m-%d %H:%M:%S"),
-                "temperature": 28 + (i % 8 - 4),  # Simulate daily temperature variation
-                "humidity": 65 + (i % 6 - 3),
-                "description": "Partly Cloudy",
-                "icon": "02d" if 6 <= (forecast_time.hour) <= 18 else "02n",
-                "wind_speed": 5.2,
-                "precipitation": 0
-            })
+        # Only the time and day/night icon change between calls; 8 slots of
+        # 3 hours make a day, so the icons repeat with period 8
+        start_hour = base_time.hour
+        icons = tuple(
+            "02d" if 6 <= (start_hour + k * 3) % 24 <= 18 else "02n"
+            for k in range(8)
+        )
+        forecasts = [
+            {
+                "datetime": (base_time + timedelta(hours=i * 3)).strftime("%Y-%m-%d %H:%M:%S"),
+                **template,
+                "icon": icons[i % 8]
+            }
+            for i, template in enumerate(_FALLBACK_FORECAST_TEMPLATES[:days * 8])
+        ]
         
         return {
             "location": "India",
             "country": "IN",
             "forecasts": forecasts,
-            "timestamp": datetime.now().isoformat(),
+            "timestamp": base_time.isoformat(),
             "fallback": True
         }
 
 # Create weather service instance
-weather_service = WeatherService()
+weather_service = WeatherService(_OWM_BASE_URL, _OWM_KEY)
+
+@router.on_event("shutdown")
+async def close_weather_client():
+    """Release pooled upstream connections on shutdown"""
+    await weather_service.aclose()
 
 @router.get("/current")
 async def get_current_weather(
@@ -298,6 +425,7 @@ async def get_weather_alerts(
     """Get weather alerts for location"""
     try:
         # Mock weather alerts - in production, integrate with weather alert services
+        now = datetime.now()
         alerts = [
             {
                 "id": "alert_001",
@@ -305,8 +433,8 @@ async def get_weather_alerts(
                 "severity": "moderate",
                 "title": "Heavy Rain Expected",
                 "description": "Heavy rainfall expected in the next 24 hours. Take necessary precautions for crops.",
-                "start_time": datetime.now().isoformat(),
-                "end_time": (datetime.now() + timedelta(hours=24)).isoformat(),
+                "start_time": now.isoformat(),
+                "end_time": (now + timedelta(hours=24)).isoformat(),
                 "affected_areas": ["Current Location"]
             }
         ]
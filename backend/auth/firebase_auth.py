@@ -1,24 +1,259 @@
 import firebase_admin
-from firebase_admin import credentials, auth, firestore
-from typing import Optional, Dict, Any
-import json
+from firebase_admin import credentials, auth, firestore, firestore_async
+from typing import Optional, Dict, Any, List, Tuple
 from pathlib import Path
 from utils.logger import logger
-from config import settings
+from utils.single_flight import single_flight
+from config.settings import settings
 import asyncio
+import base64
+import functools
+import hashlib
+import hmac
+import itertools
+import time
 from concurrent.futures import ThreadPoolExecutor
 import httpx
+import jwt
+import orjson
+from cachetools import TTLCache
+from cryptography import x509
+from google.cloud import firestore as gcf
 from twilio.rest import Client as TwilioClient
 
+try:
+    import redis.asyncio as aioredis
+except ImportError:
+    aioredis = None
+
+# Verified ID tokens, keyed by token hash, so repeat requests skip the RSA check
+_token_cache: TTLCache = TTLCache(maxsize=10000, ttl=30)
+# Verifications in progress; concurrent requests with the same token share one
+_token_inflight: Dict[str, asyncio.Task] = {}
+# Tokens revoked by logout, by token hash; ID tokens live at most an hour
+_REVOKED_TTL = 3600
+_revoked_tokens: TTLCache = TTLCache(maxsize=100_000, ttl=_REVOKED_TTL)
+# Firestore user documents by uid; dropped on update so edits show up at once
+_user_cache: TTLCache = TTLCache(maxsize=5000, ttl=60)
+# User document fetches in progress, so a burst of misses for one uid reads it once
+_user_inflight: Dict[str, asyncio.Task] = {}
+_FIRESTORE_BATCH_LIMIT = 500
+# Certificates Google signs Firebase ID tokens with, by key id; rotated every few hours
+_FIREBASE_CERTS_URL = "https://www.googleapis.com/robot/v1/metadata/x509/securetoken@system.gserviceaccount.com"
+_SIGNING_KEYS_REFRESH = 3600
+_SIGNING_KEYS_MIN_REFETCH = 60
+# Pending OTPs by phone number; unverified codes expire instead of piling up
+_OTP_TTL = 300
+_otp_store: TTLCache = TTLCache(maxsize=100_000, ttl=_OTP_TTL)
+
+# Profile fields stored on every user document, with factories for their defaults
+_USER_FIELDS = (
+    ('name', str),
+    ('email', str),
+    ('address', str),
+    ('farm_size', str),
+    ('crop_types', list),
+    ('aadhaar_verified', bool),
+)
+
+def _build_user_doc(uid: str, phone_number: str, user_data: Dict[str, Any], timestamp: Any) -> Dict[str, Any]:
+    """Build the Firestore user document from registration data"""
+    doc = {'uid': uid, 'phone': phone_number}
+    for field, default in _USER_FIELDS:
+        doc[field] = user_data[field] if field in user_data else default()
+    doc['created_at'] = doc['updated_at'] = timestamp
+    return doc
+
+# Strips "+" and spaces from phone numbers in one pass
+_PHONE_UID_TABLE = str.maketrans('', '', '+ ')
+
+@functools.lru_cache(maxsize=4096)
+def _mock_uid(phone_number: str) -> str:
+    """Development uid derived from a phone number"""
+    return f"mock_uid_{phone_number.translate(_PHONE_UID_TABLE)}"
+
+def _precheck_id_token(id_token: str) -> bool:
+    """
+    Cheap structural check of an ID token before signature verification
+    
+    Rejects tokens that are not three-segment JWTs or whose unverified
+    payload is already expired. Passing this says nothing about validity;
+    verify_id_token stays authoritative.
+    """
+    parts = id_token.split('.')
+    if len(parts) != 3:
+        return False
+    try:
+        segment = parts[1]
+        payload = orjson.loads(base64.urlsafe_b64decode(segment + '=' * (-len(segment) % 4)))
+        return payload.get('exp', 0) > time.time()
+    except Exception:
+        return False
+
+def _token_key(id_token: str) -> str:
+    """Cache/revocation key for an ID token"""
+    return hashlib.sha256(id_token.encode()).hexdigest()[:32]
+
+def _otp_matches(expected: Optional[str], otp: str) -> bool:
+    """Compare an OTP in constant time (lengths are public, so they short-circuit)"""
+    if not expected or len(otp) != len(expected):
+        return False
+    return hmac.compare_digest(expected.encode(), otp.encode())
+
 class FirebaseAuthManager:
     """Firebase Authentication Manager"""
     
     def __init__(self):
         self.app = None
-        self.db = None
-        self.executor = ThreadPoolExecutor(max_workers=4)
+        # Firestore clients, each with its own gRPC channel; _next_db() rotates over them
+        self._db_pool: List[Any] = []
+        # (client, users collection) pairs so the reference is built once per client
+        self._db_cycle = iter(())
+        # Blocking Firebase Auth SDK calls (user creation) run here; Firestore
+        # reads/writes use the native async client instead
+        self.executor = ThreadPoolExecutor(
+            max_workers=getattr(settings, 'FIREBASE_THREAD_POOL_SIZE', 32),
+            thread_name_prefix="firebase"
+        )
+        self._http_client: Optional[httpx.AsyncClient] = None
+        # Shared Redis (when REDIS_URL is set) for token revocations across
+        # workers, and for pending OTPs when OTP_BACKEND is "redis"
+        self._redis = None
+        # Public keys for ID token verification, by key id
+        self._signing_keys: Dict[str, Any] = {}
+        self._signing_keys_fetch: Optional[asyncio.Task] = None
+        self._signing_keys_fetched_at = 0.0
+        self._signing_keys_task: Optional[asyncio.Task] = None
+        # In-memory user documents for mock mode
+        self._user_store: Dict[str, Dict[str, Any]] = {}
         self._initialize_firebase()
     
+    def _get_http_client(self) -> httpx.AsyncClient:
+        """Pooled HTTP client for Google API calls, created on first use"""
+        if self._http_client is None:
+            self._http_client = httpx.AsyncClient(
+                http2=True,
+                timeout=httpx.Timeout(5.0, connect=2.0),
+                limits=httpx.Limits(max_connections=100, max_keepalive_connections=50)
+            )
+        return self._http_client
+    
+    async def startup(self):
+        """Create pooled clients and warm the token signing keys"""
+        self._get_http_client()
+        
+        redis_url = settings.REDIS_URL
+        if self._redis is None and aioredis is not None and redis_url:
+            self._redis = aioredis.from_url(redis_url, decode_responses=True)
+        
+        # Warm the token signing keys so the first requests don't fetch them
+        if self.app is not None and self._signing_keys_task is None:
+            try:
+                await self._refresh_signing_keys()
+            except Exception as e:
+                logger.warning(f"Could not fetch Firebase signing keys: {e}")
+            self._signing_keys_task = asyncio.create_task(self._refresh_signing_keys_loop())
+    
+    async def close(self):
+        """Close the pooled HTTP and Redis clients"""
+        if self._signing_keys_task is not None:
+            self._signing_keys_task.cancel()
+            self._signing_keys_task = None
+        if self._http_client is not None:
+            await self._http_client.aclose()
+            self._http_client = None
+        if self._redis is not None:
+            await self._redis.aclose()
+            self._redis = None
+    
+    async def _refresh_signing_keys(self):
+        """Fetch Google's current token signing certificates"""
+        self._signing_keys_fetched_at = time.monotonic()
+        response = await self._get_http_client().get(_FIREBASE_CERTS_URL)
+        response.raise_for_status()
+        self._signing_keys = {
+            kid: x509.load_pem_x509_certificate(pem.encode()).public_key()
+            for kid, pem in orjson.loads(response.content).items()
+        }
+    
+    async def _refresh_signing_keys_loop(self):
+        """Re-fetch the signing keys periodically so rotations are picked up"""
+        while True:
+            await asyncio.sleep(_SIGNING_KEYS_REFRESH)
+            try:
+                await self._refresh_signing_keys()
+            except Exception as e:
+                logger.warning(f"Firebase signing key refresh failed: {e}")
+    
+    async def _get_signing_key(self, kid: str) -> Any:
+        """Public key for a key id, re-fetching once if the id is unknown"""
+        key = self._signing_keys.get(kid)
+        if key is None:
+            # Concurrent misses share one fetch; unknown ids from bogus tokens
+            # can trigger at most one fetch per _SIGNING_KEYS_MIN_REFETCH seconds
+            fetch = self._signing_keys_fetch
+            if fetch is None or (
+                fetch.done()
+                and time.monotonic() - self._signing_keys_fetched_at >= _SIGNING_KEYS_MIN_REFETCH
+            ):
+                fetch = self._signing_keys_fetch = asyncio.create_task(self._refresh_signing_keys())
+            await asyncio.shield(fetch)
+            key = self._signing_keys.get(kid)
+            if key is None:
+                raise ValueError(f"Unknown token signing key: {kid}")
+        return key
+    
+    async def _decode_id_token(self, id_token: str) -> Dict[str, Any]:
+        """
+        Verify a Firebase ID token against the cached signing keys
+        
+        Checks the same claims as auth.verify_id_token (signature, expiry,
+        audience, issuer, subject) without its blocking key fetch.
+        """
+        kid = jwt.get_unverified_header(id_token).get('kid')
+        key = await self._get_signing_key(kid)
+        project_id = self.app.project_id
+        decoded_token = jwt.decode(
+            id_token,
+            key=key,
+            algorithms=['RS256'],
+            audience=project_id,
+            issuer=f"https://securetoken.google.com/{project_id}",
+            options={'require': ['exp', 'iat', 'sub']}
+        )
+        if not decoded_token['sub'] or len(decoded_token['sub']) > 128:
+            raise ValueError("Invalid subject in ID token")
+        decoded_token['uid'] = decoded_token['sub']
+        return decoded_token
+    
+    @property
+    def _otp_redis(self):
+        """Redis client for pending OTPs, or None to keep them in process"""
+        return self._redis if settings.OTP_BACKEND == "redis" else None
+    
+    async def _store_otp(self, phone_number: str, otp: str):
+        """Store a pending OTP, expiring after _OTP_TTL seconds"""
+        redis = self._otp_redis
+        if redis is not None:
+            await redis.setex(f"otp:{phone_number}", _OTP_TTL, otp)
+        else:
+            _otp_store[phone_number] = otp
+    
+    async def _get_otp(self, phone_number: str) -> Optional[str]:
+        """Get the pending OTP for a phone number, if any"""
+        redis = self._otp_redis
+        if redis is not None:
+            return await redis.get(f"otp:{phone_number}")
+        return _otp_store.get(phone_number)
+    
+    async def _clear_otp(self, phone_number: str):
+        """Remove the pending OTP once it has been used"""
+        redis = self._otp_redis
+        if redis is not None:
+            await redis.delete(f"otp:{phone_number}")
+        else:
+            _otp_store.pop(phone_number, None)
+    
     def _initialize_firebase(self):
         """Initialize Firebase Admin SDK"""
         try:
@@ -38,11 +273,11 @@ class FirebaseAuthManager:
                     return
                 
                 # Initialize Firestore
-                self.db = firestore.client()
+                self._set_db_pool(self._create_firestore_pool())
                 logger.info("Firebase initialized successfully")
             else:
                 self.app = firebase_admin.get_app()
-                self.db = firestore.client()
+                self._set_db_pool(self._create_firestore_pool())
                 logger.info("Using existing Firebase app")
                 
         except Exception as e:
@@ -53,7 +288,30 @@ class FirebaseAuthManager:
         """Create mock Firebase credentials for development"""
         logger.info("Creating mock Firebase setup for development")
         self.app = None
-        self.db = None
+        self._set_db_pool([])
+    
+    def _create_firestore_pool(self) -> List[Any]:
+        """Create FIRESTORE_POOL_SIZE async Firestore clients for the current app"""
+        size = max(1, settings.FIRESTORE_POOL_SIZE)
+        if size == 1:
+            return [firestore_async.client()]
+        
+        # firestore_async.client() returns one cached client per app, so extra
+        # clients (and channels) are built directly from the app's credentials
+        credential = self.app.credential.get_credential()
+        return [
+            gcf.AsyncClient(project=self.app.project_id, credentials=credential)
+            for _ in range(size)
+        ]
+    
+    def _set_db_pool(self, clients: List[Any]):
+        """Replace the Firestore client pool"""
+        self._db_pool = clients
+        self._db_cycle = itertools.cycle([(db, db.collection('users')) for db in clients])
+    
+    def _next_db(self) -> Tuple[Any, Any]:
+        """Next Firestore client in round-robin order with its users collection (None, None in mock mode)"""
+        return next(self._db_cycle) if self._db_pool else (None, None)
     
     async def send_otp(self, phone_number: str) -> Dict[str, Any]:
         """Send OTP to phone number"""
@@ -106,25 +364,13 @@ class FirebaseAuthManager:
             )
             
             # Store additional user data in Firestore
-            if self.db:
-                user_doc_data = {
-                    'uid': user_record.uid,
-                    'phone': phone_number,
-                    'name': user_data.get('name', ''),
-                    'email': user_data.get('email', ''),
-                    'address': user_data.get('address', ''),
-                    'farm_size': user_data.get('farm_size', ''),
-                    'crop_types': user_data.get('crop_types', []),
-                    'aadhaar_verified': user_data.get('aadhaar_verified', False),
-                    'created_at': firestore.SERVER_TIMESTAMP,
-                    'updated_at': firestore.SERVER_TIMESTAMP
-                }
-                
-                await asyncio.get_event_loop().run_in_executor(
-                    self.executor,
-                    self.db.collection('users').document(user_record.uid).set,
-                    user_doc_data
+            db, users = self._next_db()
+            if db:
+                user_doc_data = _build_user_doc(
+                    user_record.uid, phone_number, user_data, firestore.SERVER_TIMESTAMP
                 )
+                
+                await users.document(user_record.uid).set(user_doc_data)
             
             return {
                 "success": True,
@@ -136,38 +382,67 @@ class FirebaseAuthManager:
             logger.error(f"Failed to create user: {e}")
             return {"success": False, "error": str(e)}
     
+    async def bulk_create_users(self, records: List[Tuple[str, Dict[str, Any]]]) -> bool:
+        """Write many user documents with batched commits instead of one set() each"""
+        try:
+            db, users = self._next_db()
+            if db is None:
+                self._user_store.update((uid, dict(doc)) for uid, doc in records)
+                return True
+            
+            # Firestore accepts at most 500 writes per batch
+            for start in range(0, len(records), _FIRESTORE_BATCH_LIMIT):
+                batch = db.batch()
+                for uid, doc in records[start:start + _FIRESTORE_BATCH_LIMIT]:
+                    batch.set(users.document(uid), doc)
+                    _user_cache.pop(uid, None)
+                await batch.commit()
+            
+            return True
+            
+        except Exception as e:
+            logger.error(f"Failed to bulk create users: {e}")
+            return False
+    
     async def get_user(self, uid: str) -> Optional[Dict[str, Any]]:
         """Get user data from Firestore"""
         try:
-            if self.db is None:
+            db, users = self._next_db()
+            if db is None:
                 return await self._mock_get_user(uid)
             
-            user_doc = await asyncio.get_event_loop().run_in_executor(
-                self.executor,
-                self.db.collection('users').document(uid).get
-            )
+            cached = _user_cache.get(uid)
+            if cached is not None:
+                return dict(cached)
             
-            if user_doc.exists:
-                return user_doc.to_dict()
-            return None
+            user_data = await single_flight(_user_inflight, uid, lambda: self._fetch_user(users, uid))
+            return dict(user_data) if user_data is not None else None
             
         except Exception as e:
             logger.error(f"Failed to get user: {e}")
             return None
     
+    async def _fetch_user(self, users: Any, uid: str) -> Optional[Dict[str, Any]]:
+        """Read a user document from Firestore and cache it"""
+        user_doc = await users.document(uid).get()
+        if not user_doc.exists:
+            return None
+        
+        user_data = user_doc.to_dict()
+        _user_cache[uid] = dict(user_data)
+        return user_data
+    
     async def update_user(self, uid: str, user_data: Dict[str, Any]) -> bool:
         """Update user data in Firestore"""
         try:
-            if self.db is None:
+            db, users = self._next_db()
+            if db is None:
                 return True  # Mock success
             
             user_data['updated_at'] = firestore.SERVER_TIMESTAMP
             
-            await asyncio.get_event_loop().run_in_executor(
-                self.executor,
-                self.db.collection('users').document(uid).update,
-                user_data
-            )
+            await users.document(uid).update(user_data)
+            _user_cache.pop(uid, None)
             
             return True
             
@@ -181,49 +456,79 @@ class FirebaseAuthManager:
             if self.app is None:
                 return await self._mock_verify_token(id_token)
             
-            decoded_token = await asyncio.get_event_loop().run_in_executor(
-                self.executor,
-                auth.verify_id_token,
-                id_token
-            )
+            if not _precheck_id_token(id_token):
+                logger.warning("Rejected malformed or expired ID token")
+                return None
+            
+            key = _token_key(id_token)
+            if key in _revoked_tokens:
+                return None
+            
+            cached = _token_cache.get(key)
+            if cached is not None and cached.get('exp', 0) > time.time():
+                return cached
             
+            # Logouts on other workers are only visible through Redis; checked on
+            # cache misses, so they take effect within the token cache TTL
+            if self._redis is not None and await self._redis.exists(f"revoked:{key}"):
+                _revoked_tokens[key] = True
+                return None
+            
+            decoded_token = await single_flight(
+                _token_inflight, key, lambda: self._decode_id_token(id_token)
+            )
+            _token_cache[key] = decoded_token
             return decoded_token
             
         except Exception as e:
             logger.error(f"Failed to verify token: {e}")
             return None
     
+    async def revoke_token(self, id_token: str):
+        """Reject an ID token from now on, until it would have expired anyway"""
+        if self.app is None:
+            return  # Mock tokens are fixed per phone number; nothing to revoke
+        
+        key = _token_key(id_token)
+        _revoked_tokens[key] = True
+        decoded_token = _token_cache.pop(key, None) or {}
+        
+        if self._redis is not None:
+            exp = decoded_token.get('exp', time.time() + _REVOKED_TTL)
+            remaining = int(exp - time.time())
+            if remaining > 0:
+                await self._redis.setex(f"revoked:{key}", remaining, 1)
+    
     async def _send_otp_via_api(self, phone_number: str) -> Dict[str, Any]:
         """Send OTP via Firebase Auth REST API"""
         try:
             # This is a simplified version - in production you'd use Firebase Auth REST API
             # or integrate with SMS service providers like Twilio, AWS SNS, etc.
             
-            async with httpx.AsyncClient() as client:
-                # Mock API call - replace with actual Firebase Auth REST API
-                response = await client.post(
-                    "https://identitytoolkit.googleapis.com/v1/accounts:sendVerificationCode",
-                    json={
-                        "phoneNumber": phone_number,
-                        "recaptchaToken": "mock_token"  # In production, use real reCAPTCHA
-                    },
-                    headers={
-                        "Content-Type": "application/json"
-                    }
-                )
+            # Mock API call - replace with actual Firebase Auth REST API
+            response = await self._get_http_client().post(
+                "https://identitytoolkit.googleapis.com/v1/accounts:sendVerificationCode",
+                content=orjson.dumps({
+                    "phoneNumber": phone_number,
+                    "recaptchaToken": "mock_token"  # In production, use real reCAPTCHA
+                }),
+                headers={
+                    "Content-Type": "application/json"
+                }
+            )
+            
+            if response.status_code == 200:
+                return {
+                    "success": True,
+                    "session_info": "mock_session_info",
+                    "message": f"OTP sent to {phone_number}"
+                }
+            else:
+                return {
+                    "success": False,
+                    "error": "Failed to send OTP"
+                }
                 
-                if response.status_code == 200:
-                    return {
-                        "success": True,
-                        "session_info": "mock_session_info",
-                        "message": f"OTP sent to {phone_number}"
-                    }
-                else:
-                    return {
-                        "success": False,
-                        "error": "Failed to send OTP"
-                    }
-                    
         except Exception as e:
             logger.error(f"API OTP send failed: {e}")
             return await self._mock_send_otp(phone_number)
@@ -233,9 +538,7 @@ class FirebaseAuthManager:
         try:
             # Generate and store OTP
             otp_code = "123456" if settings.LOG_LEVEL == "DEBUG" else str(100000 + hash(phone_number) % 900000)[0:6]
-            if not hasattr(self, '_otp_store'):
-                self._otp_store = {}
-            self._otp_store[phone_number] = otp_code
+            await self._store_otp(phone_number, otp_code)
 
             client = TwilioClient(settings.TWILIO_ACCOUNT_SID, settings.TWILIO_AUTH_TOKEN)
             message = client.messages.create(
@@ -243,7 +546,7 @@ class FirebaseAuthManager:
                 from_=settings.TWILIO_FROM_NUMBER,
                 to=phone_number
             )
-            logger.info(f"Twilio SMS sent: sid={message.sid}")
+            logger.info("Twilio SMS sent: sid=%s", message.sid)
             return {"success": True, "message": "OTP sent via SMS"}
         except Exception as e:
             logger.error(f"Twilio send failed: {e}")
@@ -251,14 +554,12 @@ class FirebaseAuthManager:
 
     async def _verify_otp_local_store(self, phone_number: str, otp: str) -> Dict[str, Any]:
         """Verify OTP using in-memory store (Twilio path)."""
-        if not hasattr(self, '_otp_store'):
-            self._otp_store = {}
-        stored = self._otp_store.get(phone_number)
-        if stored and stored == otp:
-            del self._otp_store[phone_number]
+        stored = await self._get_otp(phone_number)
+        if _otp_matches(stored, otp):
+            await self._clear_otp(phone_number)
             return {
                 "success": True,
-                "uid": f"mock_uid_{phone_number.replace('+', '').replace(' ', '')}",
+                "uid": _mock_uid(phone_number),
                 "custom_token": f"mock_token_{phone_number}",
                 "message": "OTP verified successfully"
             }
@@ -277,16 +578,12 @@ class FirebaseAuthManager:
     
     async def _mock_send_otp(self, phone_number: str) -> Dict[str, Any]:
         """Mock OTP sending for development"""
-        logger.info(f"Mock: Sending OTP to {phone_number}")
+        logger.info("Mock: Sending OTP to %s", phone_number)
         
         # Generate a mock OTP (in development, always use 123456)
         mock_otp = "123456"
         
-        # Store OTP in memory (in production, use Redis or database)
-        if not hasattr(self, '_otp_store'):
-            self._otp_store = {}
-        
-        self._otp_store[phone_number] = mock_otp
+        await self._store_otp(phone_number, mock_otp)
         
         return {
             "success": True,
@@ -297,22 +594,19 @@ class FirebaseAuthManager:
     
     async def _mock_verify_otp(self, phone_number: str, otp: str) -> Dict[str, Any]:
         """Mock OTP verification for development"""
-        logger.info(f"Mock: Verifying OTP {otp} for {phone_number}")
+        logger.info("Mock: Verifying OTP %s for %s", otp, phone_number)
         
         # Check stored OTP
-        if not hasattr(self, '_otp_store'):
-            self._otp_store = {}
+        stored_otp = await self._get_otp(phone_number)
         
-        stored_otp = self._otp_store.get(phone_number)
-        
-        if stored_otp == otp or otp == "123456":  # Always accept 123456 in development
+        # Always accept 123456 in development
+        if _otp_matches(stored_otp, otp) or _otp_matches("123456", otp):
             # Clean up OTP
-            if phone_number in self._otp_store:
-                del self._otp_store[phone_number]
+            await self._clear_otp(phone_number)
             
             return {
                 "success": True,
-                "uid": f"mock_uid_{phone_number.replace('+', '').replace(' ', '')}",
+                "uid": _mock_uid(phone_number),
                 "custom_token": f"mock_token_{phone_number}",
                 "message": "OTP verified successfully"
             }
@@ -324,25 +618,11 @@ class FirebaseAuthManager:
     
     async def _mock_create_user(self, phone_number: str, user_data: Dict[str, Any]) -> Dict[str, Any]:
         """Mock user creation for development"""
-        uid = f"mock_uid_{phone_number.replace('+', '').replace(' ', '')}"
+        uid = _mock_uid(phone_number)
         
-        user_doc_data = {
-            'uid': uid,
-            'phone': phone_number,
-            'name': user_data.get('name', ''),
-            'email': user_data.get('email', ''),
-            'address': user_data.get('address', ''),
-            'farm_size': user_data.get('farm_size', ''),
-            'crop_types': user_data.get('crop_types', []),
-            'aadhaar_verified': user_data.get('aadhaar_verified', False),
-            'created_at': "2024-01-01T00:00:00Z",
-            'updated_at': "2024-01-01T00:00:00Z"
-        }
+        user_doc_data = _build_user_doc(uid, phone_number, user_data, "2024-01-01T00:00:00Z")
         
         # Store in memory for development
-        if not hasattr(self, '_user_store'):
-            self._user_store = {}
-        
         self._user_store[uid] = user_doc_data
         
         return {
@@ -353,9 +633,6 @@ class FirebaseAuthManager:
     
     async def _mock_get_user(self, uid: str) -> Optional[Dict[str, Any]]:
         """Mock get user for development"""
-        if not hasattr(self, '_user_store'):
-            self._user_store = {}
-        
         return self._user_store.get(uid)
     
     async def _mock_verify_token(self, id_token: str) -> Optional[Dict[str, Any]]:
@@ -363,7 +640,7 @@ class FirebaseAuthManager:
         if id_token.startswith("mock_token_"):
             phone_number = id_token.replace("mock_token_", "")
             return {
-                "uid": f"mock_uid_{phone_number.replace('+', '').replace(' ', '')}",
+                "uid": _mock_uid(phone_number),
                 "phone_number": phone_number,
                 "iss": "mock_issuer",
                 "aud": "mock_audience",
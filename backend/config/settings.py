@@ -1,4 +1,5 @@
 import os
+from functools import lru_cache
 from pathlib import Path
 from typing import Dict, Any
 from pydantic_settings import BaseSettings
@@ -29,6 +30,13 @@ class Settings(BaseSettings):
     MATLAB_OUTPUT_FORMAT: str = "structured"  # "array" or "structured"
     CONFIDENCE_THRESHOLD: float = 0.5
     
+    # Worker threads for image preprocessing/inference (kept off the event loop)
+    CV_WORKERS: int = os.cpu_count() or 1
+    
+    # Micro-batching of concurrent crop health inferences
+    INFERENCE_BATCH_MAX_SIZE: int = 16
+    INFERENCE_BATCH_WAIT_MS: float = 8.0
+    
     # API Security
     SECRET_KEY: str = os.getenv("SECRET_KEY", "your-secret-key-change-in-production")
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
@@ -48,13 +56,38 @@ class Settings(BaseSettings):
     TWILIO_ACCOUNT_SID: str | None = os.getenv("TWILIO_ACCOUNT_SID")
     TWILIO_AUTH_TOKEN: str | None = os.getenv("TWILIO_AUTH_TOKEN")
     TWILIO_FROM_NUMBER: str | None = os.getenv("TWILIO_FROM_NUMBER")
+
+    # Upstream timeouts (seconds) for configuration validation
+    VALIDATION_TIMEOUT_CONNECT: float = 2.0
+    VALIDATION_TIMEOUT_READ: float = 5.0
+
+    # Redis cache for configuration validation results (optional)
+    REDIS_URL: str | None = os.getenv("REDIS_URL")
+    
+    # Weather lookups are cached per grid cell of this size (degrees, ~5 km)
+    WEATHER_CACHE_GRID: float = 0.05
+    
+    # Firebase Admin service account; read once when the auth manager starts
+    FIREBASE_CREDENTIALS_PATH: str = os.getenv("FIREBASE_CREDENTIALS_PATH", "firebase-credentials.json")
+    FIREBASE_PROJECT_ID: str | None = os.getenv("FIREBASE_PROJECT_ID")
+    
+    # Firestore clients (one gRPC channel each) used round-robin by auth
+    FIRESTORE_POOL_SIZE: int = 4
+    
+    # Pending OTP storage: "memory" (per process) or "redis" (shared, needs REDIS_URL)
+    OTP_BACKEND: str = "memory"
     
     class Config:
         env_file = ".env"
         case_sensitive = True
 
+@lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    """Process-wide settings; the environment and .env are parsed only once"""
+    return Settings()
+
 # Global settings instance
-settings = Settings()
+settings = get_settings()
 
 # Model configuration mapping
 MODEL_CONFIG: Dict[str, Dict[str, Any]] = {
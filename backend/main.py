@@ -0,0 +1,107 @@
+"""
+AgroWatch MATLAB API
+FastAPI application entrypoint for the v1 API
+"""
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+
+import httpx
+from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse
+from fastapi.middleware.cors import CORSMiddleware
+from loguru import logger
+
+from api.v1.api import api_router
+from auth.firebase_auth import firebase_auth
+from config.settings import settings
+from models.inference_batcher import InferenceBatcher
+from models.model_loader import model_loader
+
+try:
+    import redis.asyncio as aioredis
+except ImportError:
+    aioredis = None
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Application lifespan management"""
+    logger.info(f"Starting {settings.PROJECT_NAME}...")
+
+    # Shared outbound HTTP client so upstream calls reuse keep-alive connections.
+    # HTTP/2 multiplexes concurrent probes to Google/OpenWeatherMap over one
+    # connection; retries only cover failed connection attempts.
+    app.state.http = httpx.AsyncClient(
+        timeout=httpx.Timeout(5.0, connect=2.0),
+        transport=httpx.AsyncHTTPTransport(
+            http2=True,
+            retries=1,
+            limits=httpx.Limits(
+                max_keepalive_connections=50,
+                max_connections=200,
+                keepalive_expiry=60
+            )
+        )
+    )
+
+    # Image preprocessing/inference runs here instead of on the event loop.
+    # Threads rather than processes: the loaded models live in this process,
+    # and NumPy/OpenCV release the GIL for the heavy lifting.
+    app.state.cv_pool = ThreadPoolExecutor(
+        max_workers=settings.CV_WORKERS,
+        thread_name_prefix="cv"
+    )
+    # Bound queued jobs so a burst of uploads cannot pile up unbounded work;
+    # each pool job holds one slot (utils.cv_jobs.run_cv_job)
+    app.state.cv_slots = asyncio.Semaphore(settings.CV_WORKERS * 2)
+
+    # Concurrent crop health requests share one model call per batch window
+    app.state.crop_batcher = InferenceBatcher(
+        model_loader,
+        "crop_health",
+        app.state.cv_pool,
+        max_batch=settings.INFERENCE_BATCH_MAX_SIZE,
+        max_wait=settings.INFERENCE_BATCH_WAIT_MS / 1000
+    )
+    app.state.crop_batcher.start()
+
+    # Optional Redis cache for configuration validation results. The eviction
+    # policy is a deploy-time server setting: the same Redis holds OTPs and
+    # token revocations, which must not be evicted (see API_SETUP_GUIDE.md)
+    app.state.redis = None
+    if settings.REDIS_URL and aioredis is not None:
+        app.state.redis = aioredis.from_url(settings.REDIS_URL, decode_responses=True)
+
+    # Auth pools its Google/Redis clients and keeps the token signing keys warm
+    await firebase_auth.startup()
+
+    yield
+
+    await firebase_auth.close()
+    await app.state.crop_batcher.stop()
+    await app.state.http.aclose()
+    app.state.cv_pool.shutdown(wait=False, cancel_futures=True)
+    if app.state.redis is not None:
+        await app.state.redis.aclose()
+    logger.info(f"Shutting down {settings.PROJECT_NAME}...")
+
+
+app = FastAPI(
+    title=settings.PROJECT_NAME,
+    version=settings.VERSION,
+    openapi_url=f"{settings.API_V1_STR}/openapi.json",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
+)
+
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=settings.ALLOWED_ORIGINS,
+    allow_credentials=True,
+    allow_methods=["*"],
+    allow_headers=["*"],
+)
+
+app.include_router(api_router, prefix=settings.API_V1_STR)
@@ -0,0 +1,108 @@
+import asyncio
+from concurrent.futures import Executor
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from loguru import logger
+
+from models.model_loader import MATLABModelLoader
+
+
+class InferenceBatcher:
+    """
+    Micro-batcher for model inference
+
+    Concurrent requests submit single preprocessed images; the batcher collects
+    whatever arrives within a short window and runs one predict_batch call
+    for all of them in the executor.
+    """
+
+    def __init__(
+        self,
+        loader: MATLABModelLoader,
+        model_name: str,
+        executor: Executor,
+        max_batch: int = 16,
+        max_wait: float = 0.008
+    ):
+        self.loader = loader
+        self.model_name = model_name
+        self.executor = executor
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self._queue: asyncio.Queue[Tuple[np.ndarray, asyncio.Future]] = asyncio.Queue()
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        """Start the background batching task"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the batching task and fail any requests still queued"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+        while not self._queue.empty():
+            _, future = self._queue.get_nowait()
+            if not future.done():
+                future.set_exception(RuntimeError("Inference batcher stopped"))
+
+    async def predict(self, image: np.ndarray) -> Dict[str, Any]:
+        """
+        Queue a single preprocessed image and wait for its prediction
+
+        Args:
+            image: Preprocessed image without the batch dimension
+
+        Returns:
+            Dict containing prediction results
+        """
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((image, future))
+        return await future
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            items = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+
+            # Collect more requests until the batch is full or the window closes
+            while len(items) < self.max_batch:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    items.append(await asyncio.wait_for(self._queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+
+            await self._dispatch(loop, items)
+
+    async def _dispatch(self, loop: asyncio.AbstractEventLoop, items: List[Tuple[np.ndarray, asyncio.Future]]) -> None:
+        # Skip requests whose caller has gone away
+        items = [(image, future) for image, future in items if not future.done()]
+        if not items:
+            return
+
+        try:
+            batch = np.stack([image for image, _ in items])
+            results = await loop.run_in_executor(
+                self.executor, self.loader.predict_batch, batch, self.model_name
+            )
+        except Exception as e:
+            logger.error(f"Batched inference failed for {self.model_name}: {e}")
+            for _, future in items:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, future), result in zip(items, results):
+            if not future.done():
+                future.set_result(result)
@@ -1,7 +1,7 @@
 import numpy as np
 import scipy.io
 from pathlib import Path
-from typing import Dict, Any, Tuple, Optional, Union
+from typing import Dict, Any, List, Tuple, Optional, Union
 from loguru import logger
 import json
 import cv2
@@ -169,11 +169,7 @@ class MATLABModelLoader:
             Dict containing prediction results
         """
         try:
-            if model_name not in self.models:
-                if not self.load_model(model_name):
-                    raise ValueError(f"Failed to load model: {model_name}")
-            
-            model = self.models[model_name]
+            model = self._get_model(model_name)
             config = MODEL_CONFIG[model_name]
             
             # Simulate MATLAB model inference
@@ -185,35 +181,80 @@ class MATLABModelLoader:
                 predictions = self._matlab_inference(model, image, config)
             
             # Process predictions
-            class_names = config["classes"]
             confidence_scores = predictions[0] if len(predictions.shape) > 1 else predictions
+            return self._build_result(confidence_scores, model_name)
             
-            # Get top prediction
-            predicted_class_idx = np.argmax(confidence_scores)
-            predicted_class = class_names[predicted_class_idx]
-            confidence = float(confidence_scores[predicted_class_idx])
+        except Exception as e:
+            logger.error(f"Error during prediction: {e}")
+            raise
+    
+    def predict_batch(self, images: np.ndarray, model_name: str) -> List[Dict[str, Any]]:
+        """
+        Make predictions for a batch of preprocessed images in one model call
+        
+        Args:
+            images: Preprocessed images stacked along the first axis
+            model_name: Name of the model to use
             
-            # Create detailed results
-            class_probabilities = {
-                class_names[i]: float(confidence_scores[i]) 
-                for i in range(len(class_names))
-            }
+        Returns:
+            List of prediction results, one per image
+        """
+        try:
+            model = self._get_model(model_name)
+            config = MODEL_CONFIG[model_name]
             
-            result = {
-                "prediction": predicted_class,
-                "confidence": confidence,
-                "class_probabilities": class_probabilities,
-                "model_name": model_name,
-                "model_version": self.metadata.get("version", "1.0.0"),
-                "threshold_met": confidence >= settings.CONFIDENCE_THRESHOLD
-            }
+            if not model.get("is_mock", False) and "weights" in model and "bias" in model:
+                # Linear models run as a single matrix product over the batch
+                weights = model["weights"]
+                flattened = images.reshape(len(images), -1)[:, :weights.shape[0]]
+                logits = flattened @ weights + model["bias"]
+                exp_logits = np.exp(logits - logits.max(axis=1, keepdims=True))
+                batch_scores = exp_logits / exp_logits.sum(axis=1, keepdims=True)
+            elif model.get("is_mock", False):
+                batch_scores = [self._mock_prediction(model_name, image) for image in images]
+            else:
+                batch_scores = [self._matlab_inference(model, image, config) for image in images]
             
-            return result
+            return [self._build_result(scores, model_name) for scores in batch_scores]
             
         except Exception as e:
-            logger.error(f"Error during prediction: {e}")
+            logger.error(f"Error during batch prediction: {e}")
             raise
     
+    def _get_model(self, model_name: str) -> Dict[str, Any]:
+        """Return a loaded model, loading it on first use"""
+        if model_name not in self.models:
+            if not self.load_model(model_name):
+                raise ValueError(f"Failed to load model: {model_name}")
+        return self.models[model_name]
+    
+    def _build_result(self, confidence_scores: np.ndarray, model_name: str) -> Dict[str, Any]:
+        """Turn per-class scores into a prediction result"""
+        class_names = MODEL_CONFIG[model_name]["classes"]
+        confidence_scores = np.asarray(confidence_scores, dtype=np.float64)
+        
+        # Get top prediction
+        predicted_class_idx = np.argmax(confidence_scores)
+        predicted_class = class_names[predicted_class_idx]
+        confidence = float(confidence_scores[predicted_class_idx])
+        
+        # Create detailed results
+        class_probabilities = {
+            class_names[i]: float(confidence_scores[i]) 
+            for i in range(len(class_names))
+        }
+        
+        return {
+            "prediction": predicted_class,
+            "confidence": confidence,
+            "class_probabilities": class_probabilities,
+            "probabilities": confidence_scores,
+            "class_names": tuple(class_names),
+            "model_name": model_name,
+            "model_version": self.metadata.get("version", "1.0.0"),
+            "threshold_met": confidence >= settings.CONFIDENCE_THRESHOLD
+        }
+    
     def _mock_prediction(self, model_name: str, image: np.ndarray) -> np.ndarray:
         """Generate mock prediction for development"""
         config = MODEL_CONFIG[model_name]
@@ -0,0 +1,27 @@
+"""
+Start the AgroWatch MATLAB API (v1) with uvicorn
+"""
+
+import uvicorn
+
+try:
+    # libuv-backed event loop, installed with uvicorn[standard] (not on Windows)
+    import uvloop  # noqa: F401
+    LOOP = "uvloop"
+except ImportError:
+    LOOP = "asyncio"
+
+
+if __name__ == "__main__":
+    print("🚀 Starting AgroWatch MATLAB API...")
+    print("📡 Server will be available at: http://localhost:8000/api/v1")
+    print(f"⚙️  Event loop: {LOOP}")
+
+    uvicorn.run(
+        "main:app",
+        host="0.0.0.0",
+        port=8000,
+        loop=LOOP,
+        http="httptools",
+        log_level="info"
+    )
@@ -0,0 +1,165 @@
+"""
+Local Firebase ID token verification (FirebaseAuthManager._decode_id_token)
+"""
+
+import datetime
+import time
+import types
+
+import httpx
+import jwt
+import orjson
+import pytest
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from cryptography.x509.oid import NameOID
+
+from auth.firebase_auth import FirebaseAuthManager
+
+PROJECT_ID = "agrowatch-test"
+
+
+def _make_signing_key():
+    """RSA key and the self-signed PEM certificate Google would publish for it"""
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, "securetoken")])
+    now = datetime.datetime.now(datetime.timezone.utc)
+    cert = (
+        x509.CertificateBuilder()
+        .subject_name(name)
+        .issuer_name(name)
+        .public_key(key.public_key())
+        .serial_number(x509.random_serial_number())
+        .not_valid_before(now - datetime.timedelta(days=1))
+        .not_valid_after(now + datetime.timedelta(days=1))
+        .sign(key, hashes.SHA256())
+    )
+    return key, cert.public_bytes(serialization.Encoding.PEM).decode()
+
+
+SIGNING_KEY, SIGNING_CERT = _make_signing_key()
+OTHER_KEY, _ = _make_signing_key()
+
+
+def _claims(**overrides):
+    now = int(time.time())
+    claims = {
+        "iss": f"https://securetoken.google.com/{PROJECT_ID}",
+        "aud": PROJECT_ID,
+        "sub": "user-1",
+        "iat": now - 10,
+        "exp": now + 3600,
+    }
+    claims.update(overrides)
+    return claims
+
+
+def _token(key=SIGNING_KEY, kid="key-1", algorithm="RS256", **overrides):
+    return jwt.encode(_claims(**overrides), key, algorithm=algorithm, headers={"kid": kid})
+
+
+@pytest.fixture
+def manager():
+    """Auth manager pointed at a fake certificate endpoint that counts fetches"""
+    fetches = []
+
+    def handler(request):
+        fetches.append(request.url)
+        return httpx.Response(200, content=orjson.dumps({"key-1": SIGNING_CERT}))
+
+    manager = FirebaseAuthManager()
+    manager.app = types.SimpleNamespace(project_id=PROJECT_ID)
+    manager._http_client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    manager.fetches = fetches
+    return manager
+
+
+@pytest.mark.asyncio
+async def test_valid_token_is_accepted(manager):
+    decoded = await manager._decode_id_token(_token())
+
+    assert decoded["uid"] == "user-1"
+    assert len(manager.fetches) == 1
+
+
+@pytest.mark.asyncio
+async def test_unsigned_token_is_rejected(manager):
+    token = jwt.encode(_claims(), None, algorithm="none", headers={"kid": "key-1"})
+
+    with pytest.raises(jwt.InvalidAlgorithmError):
+        await manager._decode_id_token(token)
+
+
+@pytest.mark.asyncio
+async def test_hmac_token_is_rejected(manager):
+    # HS256 "signed" with the public certificate must not pass as RS256
+    token = jwt.encode(_claims(), "shared-secret", algorithm="HS256", headers={"kid": "key-1"})
+
+    with pytest.raises(jwt.InvalidAlgorithmError):
+        await manager._decode_id_token(token)
+
+
+@pytest.mark.asyncio
+async def test_tampered_payload_is_rejected(manager):
+    header, _, signature = _token().split(".")
+    forged = jwt.utils.base64url_encode(orjson.dumps(_claims(sub="admin"))).decode()
+
+    with pytest.raises(jwt.InvalidSignatureError):
+        await manager._decode_id_token(f"{header}.{forged}.{signature}")
+
+
+@pytest.mark.asyncio
+async def test_token_signed_by_another_key_is_rejected(manager):
+    with pytest.raises(jwt.InvalidSignatureError):
+        await manager._decode_id_token(_token(key=OTHER_KEY))
+
+
+@pytest.mark.asyncio
+async def test_wrong_audience_is_rejected(manager):
+    with pytest.raises(jwt.InvalidAudienceError):
+        await manager._decode_id_token(_token(aud="another-project"))
+
+
+@pytest.mark.asyncio
+async def test_wrong_issuer_is_rejected(manager):
+    with pytest.raises(jwt.InvalidIssuerError):
+        await manager._decode_id_token(_token(iss="https://securetoken.google.com/another-project"))
+
+
+@pytest.mark.asyncio
+async def test_expired_token_is_rejected(manager):
+    now = int(time.time())
+
+    with pytest.raises(jwt.ExpiredSignatureError):
+        await manager._decode_id_token(_token(iat=now - 7200, exp=now - 3600))
+
+
+@pytest.mark.asyncio
+async def test_token_issued_in_the_future_is_rejected(manager):
+    with pytest.raises(jwt.ImmatureSignatureError):
+        await manager._decode_id_token(_token(iat=int(time.time()) + 3600))
+
+
+@pytest.mark.asyncio
+async def test_empty_subject_is_rejected(manager):
+    with pytest.raises(ValueError):
+        await manager._decode_id_token(_token(sub=""))
+
+
+@pytest.mark.asyncio
+async def test_unknown_kid_refetch_is_throttled(manager):
+    await manager._decode_id_token(_token())
+    assert len(manager.fetches) == 1
+
+    # A miss right after a fetch reuses it instead of hitting Google again
+    for _ in range(3):
+        with pytest.raises(ValueError, match="Unknown token signing key"):
+            await manager._decode_id_token(_token(kid="rotated"))
+    assert len(manager.fetches) == 1
+
+    # Once the minimum interval has passed, one miss may re-fetch
+    manager._signing_keys_fetched_at -= 3600
+    with pytest.raises(ValueError, match="Unknown token signing key"):
+        await manager._decode_id_token(_token(kid="rotated"))
+    assert len(manager.fetches) == 2
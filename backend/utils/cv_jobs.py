@@ -0,0 +1,18 @@
+import asyncio
+from typing import Any, Callable
+
+from fastapi import Request
+
+
+async def run_cv_job(request: Request, func: Callable[..., Any], *args: Any) -> Any:
+    """
+    Run one CPU-bound image job in the app's CV pool
+
+    Each job holds one cv_slots permit while it is queued or running, so
+    the number of pool jobs stays bounded however many requests arrive.
+    Only the pool job holds the permit; awaiting other work (such as the
+    inference batcher) does not.
+    """
+    state = request.app.state
+    async with state.cv_slots:
+        return await asyncio.get_running_loop().run_in_executor(state.cv_pool, func, *args)
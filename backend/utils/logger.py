@@ -1,22 +1,51 @@
+import atexit
 import logging
+import queue
 import sys
+from logging.handlers import QueueHandler, QueueListener
 from datetime import datetime
 from pathlib import Path
 
+class _RawQueueHandler(QueueHandler):
+    """QueueHandler that enqueues the record untouched
+    
+    The stock prepare() formats the message (and any traceback) on the
+    calling thread; here the listener's handlers do all formatting.
+    Log arguments are therefore read when the record is written, so pass
+    values rather than objects that are mutated right after logging.
+    """
+    
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
 def setup_logger(name: str = "agrowatch", level: int = logging.INFO) -> logging.Logger:
-    """Setup logger with file and console handlers"""
+    """Setup logger; its records reach the file and console through the root logger"""
     
-    # Create logs directory
-    log_dir = Path("logs")
-    log_dir.mkdir(exist_ok=True)
+    _setup_root_logger(level)
     
     # Create logger
     logger = logging.getLogger(name)
     logger.setLevel(level)
     
+    return logger
+
+def _setup_root_logger(level: int) -> None:
+    """Attach file and console output to the root logger, behind a queue
+    
+    Every stdlib logger in the app (not only "agrowatch") propagates here.
+    loguru keeps its own sinks and does not pass through this queue.
+    """
+    
+    root = logging.getLogger()
+    
     # Prevent duplicate handlers
-    if logger.handlers:
-        return logger
+    if any(isinstance(handler, _RawQueueHandler) for handler in root.handlers):
+        return
+    root.setLevel(level)
+    
+    # Create logs directory
+    log_dir = Path("logs")
+    log_dir.mkdir(exist_ok=True)
     
     # Create formatters
     file_formatter = logging.Formatter(
@@ -37,11 +66,16 @@ def setup_logger(name: str = "agrowatch", level: int = logging.INFO) -> logging.
     console_handler.setLevel(logging.INFO)
     console_handler.setFormatter(console_formatter)
     
-    # Add handlers to logger
-    logger.addHandler(file_handler)
-    logger.addHandler(console_handler)
+    # Request handlers only enqueue records; a background thread does the
+    # message formatting and the file/console writes
+    log_queue = queue.SimpleQueue()
+    listener = QueueListener(
+        log_queue, file_handler, console_handler, respect_handler_level=True
+    )
+    listener.start()
+    atexit.register(listener.stop)
     
-    return logger
+    root.addHandler(_RawQueueHandler(log_queue))
 
 # Create default logger
-logger = setup_logger()
\ No newline at end of file
+logger = setup_logger()
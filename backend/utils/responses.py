@@ -0,0 +1,14 @@
+from typing import Any
+
+import orjson
+from fastapi.responses import ORJSONResponse
+
+
+class NumpyORJSONResponse(ORJSONResponse):
+    """ORJSONResponse that also serializes numpy arrays/scalars and non-str dict keys"""
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(
+            content,
+            option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+        )
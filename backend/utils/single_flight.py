@@ -0,0 +1,35 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+
+async def single_flight(
+    inflight: Dict[Hashable, asyncio.Task],
+    key: Hashable,
+    run: Callable[[], Awaitable[Any]]
+) -> Any:
+    """
+    Run `run` once per key at a time; concurrent callers share its result
+
+    The work runs in its own task rather than in the first caller, so a
+    caller that is cancelled (e.g. its client disconnected) only stops
+    waiting: the others still get the result, and an exception from the
+    work reaches every caller as a normal exception.
+
+    Args:
+        inflight: Running tasks by key, owned by the caller's module
+        key: Identifies calls that may share one run
+        run: Starts the work; only called when no run for key is in progress
+    """
+    task = inflight.get(key)
+    if task is None:
+        task = asyncio.ensure_future(run())
+        inflight[key] = task
+        task.add_done_callback(lambda done: _finish(inflight, key, done))
+    return await asyncio.shield(task)
+
+
+def _finish(inflight: Dict[Hashable, asyncio.Task], key: Hashable, task: asyncio.Task) -> None:
+    if inflight.get(key) is task:
+        del inflight[key]
+    if not task.cancelled():
+        task.exception()  # retrieved here in case every caller stopped waiting
@@ -0,0 +1,34 @@
+from fastapi import HTTPException, UploadFile
+
+from config.settings import settings
+
+UPLOAD_CHUNK_SIZE = 64 * 1024
+
+
+async def enforce_upload_limit(file: UploadFile, max_bytes: int = settings.MAX_IMAGE_SIZE) -> None:
+    """
+    Reject an upload larger than max_bytes before it is decoded
+    
+    Uses the size Starlette recorded while spooling the upload when available,
+    otherwise counts the file in fixed-size chunks so it is never held in
+    memory as a whole. The file is rewound for the caller afterwards.
+    
+    Raises:
+        HTTPException: 413 if the upload exceeds max_bytes
+    """
+    too_large = HTTPException(
+        status_code=413,
+        detail=f"Image too large. Maximum size is {max_bytes // (1024 * 1024)}MB"
+    )
+    
+    if file.size is not None:
+        if file.size > max_bytes:
+            raise too_large
+    else:
+        total = 0
+        while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+            total += len(chunk)
+            if total > max_bytes:
+                raise too_large
+    
+    await file.seek(0)
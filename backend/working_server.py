@@ -9,14 +9,19 @@ import os
 from contextlib import asynccontextmanager
 from fastapi import FastAPI, HTTPException, Depends, UploadFile, File, Header, Query
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, ORJSONResponse
 from pydantic import BaseModel
 import uvicorn
 from datetime import datetime, timedelta
-import jwt
+import functools
+import hashlib
+import hmac
+import time
 from typing import Optional, Dict, Any
 import re
 import httpx
+import jwt
+from cachetools import TTLCache
 
 # Import Twilio API
 try:
@@ -31,6 +36,9 @@ SECRET_KEY = "test-secret-key-for-development"
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
+# Verified token payloads by token digest, so repeat requests skip jwt.decode
+_token_cache: TTLCache = TTLCache(maxsize=10000, ttl=300)
+
 # Setup logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -50,7 +58,8 @@ app = FastAPI(
     openapi_url="/api/v1/openapi.json",
     docs_url="/api/v1/docs",
     redoc_url="/api/v1/redoc",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
 )
 
 # Add CORS middleware
@@ -112,9 +121,12 @@ class CropHealthAnalysisRequest(BaseModel):
     image_url: str
 
 # Helper functions
+_PHONE_STRIP_RE = re.compile(r'[^\d+]')
+
+@functools.lru_cache(maxsize=4096)
 def normalize_phone_number(phone: str) -> str:
     """Normalize phone number to international format"""
-    phone = re.sub(r'[^\d+]', '', phone)
+    phone = _PHONE_STRIP_RE.sub('', phone)
     
     if phone.startswith('+91'):
         return phone
@@ -129,31 +141,37 @@ def normalize_phone_number(phone: str) -> str:
 
 def generate_access_token(user_data: Dict[str, Any]) -> str:
     """Generate JWT access token"""
+    now = int(time.time())
     to_encode = {
         "sub": user_data["phone"],
         "name": user_data.get("name", ""),
-        "exp": datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES),
-        "iat": datetime.utcnow()
+        "exp": now + ACCESS_TOKEN_EXPIRE_MINUTES * 60,
+        "iat": now
     }
     
-    encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
-    return encoded_jwt
+    return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
 def verify_token(token: str) -> Dict[str, Any]:
     """Verify JWT access token"""
+    key = hashlib.blake2b(token.encode(), digest_size=16).digest()
+    cached = _token_cache.get(key)
+    if cached is not None and cached["exp"] > time.time():
+        return dict(cached)
+    
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        phone_number = payload.get("sub")
-        
-        if phone_number is None:
-            raise HTTPException(status_code=401, detail="Invalid token")
-        
-        return payload
-        
+        payload = jwt.decode(
+            token, SECRET_KEY, algorithms=[ALGORITHM], options={"require": ["exp", "sub"]}
+        )
     except jwt.ExpiredSignatureError:
         raise HTTPException(status_code=401, detail="Token has expired")
-    except jwt.JWTError:
+    except jwt.InvalidTokenError:
         raise HTTPException(status_code=401, detail="Invalid token")
+    
+    # Only verified payloads are cached, under a digest of the whole token
+    _token_cache[key] = dict(payload)
+    return payload
+
+_BEARER_PREFIX = "Bearer "
 
 def get_current_user(authorization: Optional[str] = Header(None)):
     """Get current authenticated user with proper header handling"""
@@ -164,15 +182,14 @@ def get_current_user(authorization: Optional[str] = Header(None)):
             headers={"WWW-Authenticate": "Bearer"}
         )
     
-    if not authorization.startswith("Bearer "):
+    if not authorization.startswith(_BEARER_PREFIX):
         raise HTTPException(
             status_code=401, 
             detail="Invalid authorization header format. Expected: Bearer <token>",
             headers={"WWW-Authenticate": "Bearer"}
         )
     
-    token = authorization.replace("Bearer ", "")
-    return verify_token(token)
+    return verify_token(authorization[len(_BEARER_PREFIX):])
 
 # Mock user storage (in production, use database)
 mock_users = {}
@@ -263,20 +280,22 @@ async def get_current_weather(
         # Create location-based variations
         lat_factor = abs(lat) % 10
         lon_factor = abs(lon) % 10
-        time_factor = int(datetime.now().strftime("%H"))
+        # One clock read for every time-derived field
+        now = datetime.now()
+        time_factor = now.hour
         
         # Temperature varies by latitude and time
         base_temp = 20 + (lat_factor * 2)  # Colder at higher latitudes
         temp_variation = (time_factor - 12) * 2  # Warmer during day
-        temperature = round(base_temp + temp_variation + (int(datetime.now().strftime("%H")) % 5 - 2))
+        temperature = round(base_temp + temp_variation + (now.hour % 5 - 2))
         
         # Humidity varies by longitude and time
         base_humidity = 60 + (lon_factor * 3)  # More humid in some regions
-        humidity = base_humidity + (int(datetime.now().strftime("%M")) % 15 - 7)
+        humidity = base_humidity + (now.minute % 15 - 7)
         
         # Pressure varies by altitude (simulated by lat/lon)
         base_pressure = 1013 + (lat_factor * 2) - (lon_factor * 1)
-        pressure = base_pressure + (int(datetime.now().strftime("%d")) % 10 - 5)
+        pressure = base_pressure + (now.day % 10 - 5)
         
         # Wind varies by location
         wind_speed = 3 + (lat_factor + lon_factor) % 8
@@ -319,7 +338,7 @@ async def get_current_weather(
             "country": "IN",
             "visibility": 10 + (lat_factor % 5),
             "uv_index": None,
-            "timestamp": datetime.now().isoformat(),
+            "timestamp": now.isoformat(),
             "coordinates": {"lat": lat, "lon": lon},
             "fallback": True
         }
@@ -412,13 +431,15 @@ async def get_weather_by_city_name(city_name: str):
         }
         
         city_data = city_variations.get(city_name.lower(), city_variations["delhi"])
-        time_factor = int(datetime.now().strftime("%H"))
-        minute_factor = int(datetime.now().strftime("%M"))
+        # One clock read for every time-derived field
+        now = datetime.now()
+        time_factor = now.hour
+        minute_factor = now.minute
         
         weather_data = {
             "temperature": city_data["base_temp"] + (time_factor % 8 - 4) + (minute_factor % 3 - 1),
             "humidity": city_data["base_humidity"] + (minute_factor % 15 - 7),
-            "pressure": city_data["base_pressure"] + (int(datetime.now().strftime("%d")) % 10 - 5),
+            "pressure": city_data["base_pressure"] + (now.day % 10 - 5),
             "wind_speed": 4 + (time_factor % 6) + (minute_factor % 3),
             "wind_direction": (time_factor * 15 + minute_factor * 2) % 360,
             "description": city_data["description"],
@@ -427,7 +448,7 @@ async def get_weather_by_city_name(city_name: str):
             "country": "IN",
             "visibility": 8 + (time_factor % 5),
             "uv_index": None,
-            "timestamp": datetime.now().isoformat(),
+            "timestamp": now.isoformat(),
             "coordinates": {"lat": coords[0], "lon": coords[1]},
             "fallback": True
         }
@@ -483,7 +504,7 @@ async def verify_otp(request: VerifyOTPRequest):
         phone = normalize_phone_number(request.phone)
         
         # Mock OTP verification
-        if request.otp == "1234":
+        if hmac.compare_digest(request.otp.encode(), b"1234"):
             user_data = {
                 "phone": phone,
                 "name": "Test User",